@@ -1,9 +1,27 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Body, Depends, Query
-from infrastructure.db import get_session
-from schemas import GroupCreate, GroupOut, GroupUpdate
-from services.groups import GroupService
+from api.conditional import etag_matches, make_etag, not_modified
+from api.responses import json_response
+from api.streaming import streaming_response, wants_ndjson
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from infrastructure.db import get_read_session, get_session
+from schemas import (
+    BulkChangeResult,
+    GroupBulkUpdate,
+    GroupCreate,
+    GroupMemberCounts,
+    GroupMembershipChange,
+    GroupMembershipResult,
+    GroupOut,
+    GroupRelative,
+    GroupStats,
+    GroupTreeNode,
+    GroupUpdate,
+    SiteOut,
+)
+from services.base import DEFAULT_PAGE_SIZE, FILTER_HELP, MAX_PAGE_SIZE, CountMode, operator_filters
+from services.groups import DEFAULT_TREE_DEPTH, MAX_TREE_DEPTH, GroupService
+from services.sites import SiteService
 from sqlalchemy.ext.asyncio import AsyncSession
 
 group_router = APIRouter(prefix="/groups", tags=["groups"])
@@ -20,12 +38,31 @@ async def create_group(
     return await service.create_group(group_data)
 
 
-@group_router.get("")
+@group_router.get("", description=FILTER_HELP)
 async def list_groups(
-    db: Annotated[AsyncSession, Depends(get_session)],
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
     name: str | None = Query(None, description="Filter by name"),
     group_type: str | None = Query(None, description="Filter by type"),
     sort: str | None = Query(None, description="Sort parameter (e.g., 'name', '-name')"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: str | None = Query(None, description="Cursor from the X-Next-Cursor header"),
+    stream: bool = Query(
+        False, description="Stream every match as a chunked JSON array (or NDJSON via Accept)"
+    ),
+    q: str | None = Query(
+        None, min_length=1, description="Search names, best matches first unless sorted"
+    ),
+    count: CountMode = Query(
+        "none", description="X-Total-Count header: exact, estimated from planner statistics, none"
+    ),
+    fields: str | None = Query(
+        None, description="Comma separated fields to return (e.g., 'id,name'), all by default"
+    ),
+    expand: str | None = Query(
+        None, description="Comma separated relationships to embed, all unless `fields` is set"
+    ),
 ) -> list[GroupOut]:
     service = GroupService(db)
     filters = {}
@@ -33,13 +70,253 @@ async def list_groups(
         filters["name"] = name
     if group_type:
         filters["type"] = group_type
-    return await service.list_groups(filters=filters if filters else None, sort=sort)
+    filters.update(operator_filters(request.query_params))
+    field_list, relations = GroupService.sparse_fieldset(fields, expand)
+    if stream or wants_ndjson(request):
+        stmt = await service.stream_statement(
+            service.group_columns(field_list), filters or None, sort, search=q
+        )
+        return streaming_response(
+            request,
+            lambda session: GroupService(session).stream_groups(stmt, field_list, relations),
+        )
+    etag = make_etag(request.url.query, *await service.list_version(filters or None))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    total = await service.count_with_filters(count, filters or None, search=q)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    page = await service.list_groups(
+        filters=filters if filters else None,
+        sort=sort,
+        limit=limit,
+        after=after,
+        fields=field_list,
+        expand=relations,
+        search=q,
+    )
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return json_response(page.items, response)
+
+
+@group_router.patch("", description=FILTER_HELP)
+async def update_groups(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_session)],
+    group_data: GroupBulkUpdate,
+    name: str | None = Query(None, description="Filter by name"),
+    group_type: str | None = Query(None, description="Filter by type"),
+    dry_run: bool = Query(False, description="Only count the groups that would be updated"),
+) -> BulkChangeResult:
+    filters = {field: value for field, value in {"name": name, "type": group_type}.items() if value}
+    filters.update(operator_filters(request.query_params))
+    service = GroupService(db)
+    return await service.update_groups(filters, group_data, dry_run)
+
+
+@group_router.delete("", description=FILTER_HELP)
+async def delete_groups(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_session)],
+    name: str | None = Query(None, description="Filter by name"),
+    group_type: str | None = Query(None, description="Filter by type"),
+    dry_run: bool = Query(
+        False, description="Only count the groups, subgroups included, that would be deleted"
+    ),
+) -> BulkChangeResult:
+    filters = {field: value for field, value in {"name": name, "type": group_type}.items() if value}
+    filters.update(operator_filters(request.query_params))
+    service = GroupService(db)
+    return await service.delete_groups(filters, dry_run)
 
 
 @group_router.get("/{group_id}")
-async def get_group(group_id: int, db: Annotated[AsyncSession, Depends(get_session)]) -> GroupOut:
+async def get_group(
+    group_id: int,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    members: Literal["full", "counts"] = Query(
+        "full", description="Embed the member lists, or only count them (see /sites, /children)"
+    ),
+) -> GroupOut | GroupMemberCounts:
     service = GroupService(db)
-    return await service.get_group(group_id)
+    if members == "counts":
+        version, counts = await service.get_group_member_counts(group_id)
+        etag = make_etag("group-counts", group_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return json_response(counts, response)
+    etag = make_etag("group", group_id, await service.get_group_version(group_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    version, group = await service.get_versioned_group(group_id)
+    response.headers["ETag"] = make_etag("group", group_id, version)
+    return json_response(group, response)
+
+
+@group_router.get("/{group_id}/sites", description=FILTER_HELP)
+async def list_group_sites(
+    group_id: int,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    name: str | None = Query(None, description="Filter by name"),
+    country: str | None = Query(None, description="Filter by country"),
+    installation_date: str | None = Query(None, description="Filter by installation date"),
+    sort: str | None = Query(None, description="Sort parameter (e.g., 'name', '-name')"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: str | None = Query(None, description="Cursor from the X-Next-Cursor header"),
+    q: str | None = Query(
+        None, min_length=1, description="Search names, best matches first unless sorted"
+    ),
+    count: CountMode = Query(
+        "none", description="X-Total-Count header: exact, estimated from planner statistics, none"
+    ),
+    fields: str | None = Query(
+        None, description="Comma separated fields to return (e.g., 'id,name'), all by default"
+    ),
+    expand: str | None = Query(
+        None, description="Comma separated relationships to embed, all unless `fields` is set"
+    ),
+) -> list[SiteOut]:
+    service = SiteService(db)
+    filters = {}
+    if name:
+        filters["name"] = name
+    if country:
+        filters["country"] = country
+    if installation_date:
+        filters["installation_date"] = installation_date
+    filters.update(operator_filters(request.query_params))
+    field_list, relations = SiteService.sparse_fieldset(fields, expand)
+    conditions = [await service.group_sites_condition(group_id)]
+    etag = make_etag(
+        "group-sites", group_id, request.url.query, *await service.list_version(filters or None)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    total = await service.count_with_filters(count, filters or None, conditions, search=q)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    page = await service.list_site_rows(
+        filters or None,
+        sort,
+        limit=limit,
+        after=after,
+        conditions=conditions,
+        fields=field_list,
+        expand=relations,
+        search=q,
+    )
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return json_response(page.items, response)
+
+
+@group_router.get("/{group_id}/children", description=FILTER_HELP)
+async def list_child_groups(
+    group_id: int,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    name: str | None = Query(None, description="Filter by name"),
+    group_type: str | None = Query(None, description="Filter by type"),
+    sort: str | None = Query(None, description="Sort parameter (e.g., 'name', '-name')"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: str | None = Query(None, description="Cursor from the X-Next-Cursor header"),
+    q: str | None = Query(
+        None, min_length=1, description="Search names, best matches first unless sorted"
+    ),
+    count: CountMode = Query(
+        "none", description="X-Total-Count header: exact, estimated from planner statistics, none"
+    ),
+    fields: str | None = Query(
+        None, description="Comma separated fields to return (e.g., 'id,name'), all by default"
+    ),
+    expand: str | None = Query(
+        None, description="Comma separated relationships to embed, all unless `fields` is set"
+    ),
+) -> list[GroupOut]:
+    service = GroupService(db)
+    filters = {}
+    if name:
+        filters["name"] = name
+    if group_type:
+        filters["type"] = group_type
+    filters.update(operator_filters(request.query_params))
+    field_list, relations = GroupService.sparse_fieldset(fields, expand)
+    conditions = [await service.child_groups_condition(group_id)]
+    etag = make_etag(
+        "group-children", group_id, request.url.query, *await service.list_version(filters or None)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    total = await service.count_with_filters(count, filters or None, conditions, search=q)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    page = await service.list_groups(
+        filters=filters or None,
+        sort=sort,
+        limit=limit,
+        after=after,
+        fields=field_list,
+        expand=relations,
+        search=q,
+        conditions=conditions,
+    )
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return json_response(page.items, response)
+
+
+@group_router.get("/{group_id}/stats")
+async def get_group_stats(
+    group_id: int, db: Annotated[AsyncSession, Depends(get_read_session)]
+) -> GroupStats:
+    service = GroupService(db)
+    return await service.get_group_stats(group_id)
+
+
+@group_router.get("/{group_id}/tree")
+async def get_group_tree(
+    group_id: int,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    max_depth: int = Query(DEFAULT_TREE_DEPTH, ge=0, le=MAX_TREE_DEPTH),
+) -> GroupTreeNode:
+    service = GroupService(db)
+    return await service.get_group_tree(group_id, max_depth)
+
+
+@group_router.get("/{group_id}/descendants")
+async def get_group_descendants(
+    group_id: int,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    max_depth: int = Query(DEFAULT_TREE_DEPTH, ge=0, le=MAX_TREE_DEPTH),
+) -> list[GroupRelative]:
+    service = GroupService(db)
+    return await service.get_group_descendants(group_id, max_depth)
+
+
+@group_router.get("/{group_id}/all-sites")
+async def list_group_tree_sites(
+    group_id: int,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    sort: str | None = Query(None, description="Sort parameter (e.g., 'name', '-name')"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: str | None = Query(None, description="Cursor from the X-Next-Cursor header"),
+) -> list[SiteOut]:
+    service = SiteService(db)
+    page = await service.list_sites_in_group_tree(group_id, sort=sort, limit=limit, after=after)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return json_response(page.items, response)
 
 
 @group_router.patch("/{group_id}")
@@ -54,6 +331,38 @@ async def update_group(
     return await service.update_group(group_id, group_data)
 
 
+@group_router.post("/{group_id}/sites:add")
+async def add_group_sites(
+    group_id: int, change: GroupMembershipChange, db: Annotated[AsyncSession, Depends(get_session)]
+) -> GroupMembershipResult:
+    service = GroupService(db)
+    return await service.add_members(group_id, "sites", change.ids)
+
+
+@group_router.post("/{group_id}/sites:remove")
+async def remove_group_sites(
+    group_id: int, change: GroupMembershipChange, db: Annotated[AsyncSession, Depends(get_session)]
+) -> GroupMembershipResult:
+    service = GroupService(db)
+    return await service.remove_members(group_id, "sites", change.ids)
+
+
+@group_router.post("/{group_id}/child_groups:add")
+async def add_child_groups(
+    group_id: int, change: GroupMembershipChange, db: Annotated[AsyncSession, Depends(get_session)]
+) -> GroupMembershipResult:
+    service = GroupService(db)
+    return await service.add_members(group_id, "child_groups", change.ids)
+
+
+@group_router.post("/{group_id}/child_groups:remove")
+async def remove_child_groups(
+    group_id: int, change: GroupMembershipChange, db: Annotated[AsyncSession, Depends(get_session)]
+) -> GroupMembershipResult:
+    service = GroupService(db)
+    return await service.remove_members(group_id, "child_groups", change.ids)
+
+
 @group_router.delete("/{group_id}")
 async def delete_group(group_id: int, db: Annotated[AsyncSession, Depends(get_session)]):
     service = GroupService(db)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from infrastructure.db import engine, read_router
+from services.cache import group_cache, site_cache
+
+metrics_router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@metrics_router.get("/cache")
+async def get_cache_stats() -> dict[str, dict[str, int]]:
+    return {"sites": site_cache.stats(), "groups": group_cache.stats()}
+
+
+@metrics_router.get("/pool")
+async def get_pool_stats() -> dict[str, dict[str, int | float]]:
+    pools = {"primary": engine.pool.stats()}
+    if read_router.replica is not None:
+        pools["replica"] = read_router.replica.kw["bind"].pool.stats()
+    return pools
@@ -0,0 +1,18 @@
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def json_response(
+    content: BaseModel | list[BaseModel | dict], response: Response
+) -> ORJSONResponse:
+    """Serialize already validated models (or plain rows) with orjson.
+
+    Returning a response skips FastAPI's second validation against the response model;
+    headers set on the injected `response` are carried over.
+    """
+    if isinstance(content, BaseModel):
+        payload = content.model_dump()
+    else:
+        payload = [item.model_dump() if isinstance(item, BaseModel) else item for item in content]
+    return ORJSONResponse(payload, headers=dict(response.headers))
@@ -1,9 +1,35 @@
 from typing import Annotated, List
 
-from fastapi import APIRouter, Body, Depends, Query
-from infrastructure.db import get_session
-from schemas import SiteCreate, SiteOut, SiteUpdate
-from services.sites import SiteService
+from api.conditional import etag_matches, make_etag, not_modified
+from api.responses import json_response
+from api.streaming import streaming_response, wants_ndjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from infrastructure.db import async_session_maker, get_read_session, get_session
+from schemas import (
+    BulkChangeResult,
+    GroupRelative,
+    SimulationJob,
+    SimulationRequest,
+    SiteBulkResult,
+    SiteBulkUpdate,
+    SiteCreate,
+    SiteEstimate,
+    SiteEstimateRequest,
+    SiteOut,
+    SiteStats,
+    SiteUpdate,
+)
+from services.base import (
+    DEFAULT_PAGE_SIZE,
+    FILTER_HELP,
+    MAX_PAGE_SIZE,
+    CountMode,
+    operator_filters,
+    parse_field_list,
+)
+from services.groups import GroupService
+from services.jobs import simulation_jobs
+from services.sites import MAX_BULK_SIZE, STATS_DIMENSIONS, SiteService
 from sqlalchemy.ext.asyncio import AsyncSession
 
 site_router = APIRouter(prefix="/sites", tags=["sites"])
@@ -28,13 +54,63 @@ async def create_site(
     return await service.create_site(site_data)
 
 
-@site_router.get("")
-async def list_sites(
+@site_router.post("/bulk")
+async def bulk_create_sites(
     db: Annotated[AsyncSession, Depends(get_session)],
+    sites_data: list[SiteCreate] = Body(
+        max_length=MAX_BULK_SIZE,
+        example=[
+            {
+                "name": "s1",
+                "installation_date": "2025-07-20",
+                "max_power_megawatt": 1,
+                "min_power_megawatt": 2,
+                "country": "fr",
+                "groups": [1],
+                "useful_energy_at_1_megawatt": 0,
+            },
+            {
+                "name": "s2",
+                "installation_date": "2025-07-19",
+                "max_power_megawatt": 1,
+                "min_power_megawatt": 2,
+                "country": "it",
+                "groups": [],
+                "efficiency": 0.9,
+            },
+        ],
+    ),
+) -> list[SiteBulkResult]:
+    service = SiteService(db)
+    return await service.bulk_create_sites(sites_data)
+
+
+@site_router.get("", description=FILTER_HELP)
+async def list_sites(
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
     name: str | None = Query(None, description="Filter by name"),
     country: str | None = Query(None, description="Filter by country"),
     installation_date: str | None = Query(None, description="Filter by installation date"),
     sort: str | None = Query(None, description="Sort parameter (e.g., 'name', '-name')"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: str | None = Query(None, description="Cursor from the X-Next-Cursor header"),
+    stream: bool = Query(
+        False, description="Stream every match as a chunked JSON array (or NDJSON via Accept)"
+    ),
+    q: str | None = Query(
+        None, min_length=1, description="Search names, best matches first unless sorted"
+    ),
+    count: CountMode = Query(
+        "none", description="X-Total-Count header: exact, estimated from planner statistics, none"
+    ),
+    fields: str | None = Query(
+        None, description="Comma separated fields to return (e.g., 'id,name'), all by default"
+    ),
+    expand: str | None = Query(
+        None, description="Comma separated relationships to embed, all unless `fields` is set"
+    ),
 ) -> List[SiteOut]:
     service = SiteService(db)
     filters = {}
@@ -44,13 +120,145 @@ async def list_sites(
         filters["country"] = country
     if installation_date:
         filters["installation_date"] = installation_date
-    return await service.list_sites(filters=filters if filters else None, sort=sort)
+    filters.update(operator_filters(request.query_params))
+    field_list, relations = SiteService.sparse_fieldset(fields, expand)
+    if stream or wants_ndjson(request):
+        stmt = await service.stream_statement(
+            service.site_columns(field_list), filters or None, sort, search=q
+        )
+        return streaming_response(
+            request, lambda session: SiteService(session).stream_sites(stmt, field_list, relations)
+        )
+    etag = make_etag(request.url.query, *await service.list_version(filters or None))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    total = await service.count_with_filters(count, filters or None, search=q)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    page = await service.list_sites(
+        filters=filters if filters else None,
+        sort=sort,
+        limit=limit,
+        after=after,
+        fields=field_list,
+        expand=relations,
+        search=q,
+    )
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return json_response(page.items, response)
+
+
+@site_router.patch("", description=FILTER_HELP)
+async def update_sites(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_session)],
+    site_data: SiteBulkUpdate,
+    name: str | None = Query(None, description="Filter by name"),
+    country: str | None = Query(None, description="Filter by country"),
+    installation_date: str | None = Query(None, description="Filter by installation date"),
+    dry_run: bool = Query(False, description="Only count the sites that would be updated"),
+) -> BulkChangeResult:
+    filters = {"name": name, "country": country, "installation_date": installation_date}
+    filters = {field: value for field, value in filters.items() if value}
+    filters.update(operator_filters(request.query_params))
+    service = SiteService(db)
+    return await service.update_sites(filters, site_data, dry_run)
+
+
+@site_router.delete("", description=FILTER_HELP)
+async def delete_sites(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_session)],
+    name: str | None = Query(None, description="Filter by name"),
+    country: str | None = Query(None, description="Filter by country"),
+    installation_date: str | None = Query(None, description="Filter by installation date"),
+    dry_run: bool = Query(False, description="Only count the sites that would be deleted"),
+) -> BulkChangeResult:
+    filters = {"name": name, "country": country, "installation_date": installation_date}
+    filters = {field: value for field, value in filters.items() if value}
+    filters.update(operator_filters(request.query_params))
+    service = SiteService(db)
+    return await service.delete_sites(filters, dry_run)
+
+
+@site_router.post("/estimate")
+async def estimate_production(
+    db: Annotated[AsyncSession, Depends(get_session)],
+    estimate_data: SiteEstimateRequest = Body(
+        example={"group_id": 1, "filters": {"country": "fr"}, "hours": 24, "load_factor": 0.8}
+    ),
+) -> SiteEstimate:
+    service = SiteService(db)
+    return await service.estimate_production(estimate_data)
+
+
+@site_router.post("/simulations", status_code=202)
+async def start_simulation(
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    scenario_data: SimulationRequest = Body(
+        example={"start": "2026-01-01", "days": 3650, "curtailment": 0.2, "group_id": 1}
+    ),
+) -> SimulationJob:
+    # An unknown group or filter fails the request rather than the job
+    await SiteService(db).scoped_query_builder(scenario_data)
+
+    async def run() -> dict:
+        async with async_session_maker() as session:
+            return await SiteService(session).simulate_production(scenario_data)
+
+    return SimulationJob.model_validate(simulation_jobs.submit(run))
+
+
+@site_router.get("/simulations/{job_id}")
+async def get_simulation(job_id: str) -> SimulationJob:
+    job = simulation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return SimulationJob.model_validate(job)
+
+
+@site_router.get("/stats", description=FILTER_HELP)
+async def get_site_stats(
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+    group_by: str = Query(
+        "country", description="Comma separated keys among country, month and group"
+    ),
+    rollup: bool = Query(False, description="Add subtotal rows, rolled up keys being null"),
+    country: str | None = Query(None, description="Filter by country"),
+) -> list[SiteStats]:
+    filters = {"country": country} if country else {}
+    filters.update(operator_filters(request.query_params))
+    keys = parse_field_list(group_by, STATS_DIMENSIONS, "group_by")
+    service = SiteService(db)
+    return json_response(await service.site_stats(keys, filters or None, rollup), response)
 
 
 @site_router.get("/{site_id}")
-async def get_site(site_id: int, db: Annotated[AsyncSession, Depends(get_session)]) -> SiteOut:
+async def get_site(
+    site_id: int,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_session)],
+) -> SiteOut:
     service = SiteService(db)
-    return await service.get_site(site_id)
+    etag = make_etag("site", site_id, await service.get_site_version(site_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    version, site = await service.get_versioned_site(site_id)
+    response.headers["ETag"] = make_etag("site", site_id, version)
+    return json_response(site, response)
+
+
+@site_router.get("/{site_id}/ancestor-groups")
+async def get_site_ancestor_groups(
+    site_id: int, db: Annotated[AsyncSession, Depends(get_read_session)]
+) -> list[GroupRelative]:
+    service = GroupService(db)
+    return await service.get_ancestor_groups_of_site(site_id)
 
 
 @site_router.patch("/{site_id}")
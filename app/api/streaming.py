@@ -0,0 +1,58 @@
+from collections.abc import AsyncIterator, Callable
+
+import orjson
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from infrastructure.db import read_router
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+Item = BaseModel | dict
+BatchFactory = Callable[[AsyncSession], AsyncIterator[list[Item]]]
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for newline-delimited JSON."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _encode(item: Item) -> bytes:
+    if isinstance(item, BaseModel):
+        return item.model_dump_json().encode()
+    return orjson.dumps(item)
+
+
+async def _ndjson_chunks(batches: AsyncIterator[list[Item]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        if batch:
+            yield b"".join(_encode(item) + b"\n" for item in batch)
+
+
+async def _json_array_chunks(batches: AsyncIterator[list[Item]]) -> AsyncIterator[bytes]:
+    yield b"["
+    separator = b""
+    async for batch in batches:
+        if batch:
+            yield separator + b",".join(_encode(item) for item in batch)
+            separator = b","
+    yield b"]"
+
+
+def streaming_response(request: Request, batches: BatchFactory) -> StreamingResponse:
+    """Stream the batches produced by `batches` as a JSON array or as NDJSON.
+
+    The response body is consumed after the request dependencies are torn down, so the
+    stream opens and owns its own read-only database session.
+    """
+    ndjson = wants_ndjson(request)
+
+    async def body() -> AsyncIterator[bytes]:
+        async with read_router.session(request) as session:
+            chunks = _ndjson_chunks if ndjson else _json_array_chunks
+            async for chunk in chunks(batches(session)):
+                yield chunk
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE if ndjson else JSON_MEDIA_TYPE)
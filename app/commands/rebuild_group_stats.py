@@ -0,0 +1,25 @@
+"""
+Recompute the `group_stats` row of every group from the sites and the closure table.
+
+Writes keep the rows current by adding and removing the contribution of the sites they
+change, rebuilding is only needed after changes made outside the services (manual SQL,
+restored dumps) or to clear the rounding drift of many incremental updates:
+
+    python -m commands.rebuild_group_stats
+"""
+
+import asyncio
+
+from infrastructure.db import async_session_maker, engine
+from services.groups import GroupService
+
+
+async def main() -> None:
+    async with async_session_maker() as session:
+        await GroupService(session).refresh_group_stats()
+        await session.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,6 +8,34 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     db_url: PostgresDsn
     db_test_url: PostgresDsn
+    # Optional streaming replica serving the GET routes
+    db_replica_url: PostgresDsn | None = None
+    db_test_replica_url: PostgresDsn | None = None
+    # Seconds a client reads from the primary after a write, so it sees its own writes
+    db_primary_pin_seconds: int = 5
+    # Seconds reads stay on the primary once the replica failed to connect
+    db_replica_retry_seconds: float = 30.0
+
+    # Connection pool of each worker process, see infrastructure.db
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # Seconds after which a connection is replaced, -1 keeps connections open
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    # Prepared statements kept per connection, 0 disables the cache
+    db_statement_cache_size: int = 100
+    # Transaction pooling through PgBouncer: no statement cache, unique statement names
+    db_pgbouncer: bool = False
+
+    # In-process read cache of GET /sites/{id} and GET /groups/{id}, 0 disables it
+    cache_max_size: int = 10_000
+    cache_ttl_seconds: float = 30.0
+
+    # Worker processes running simulations, 0 uses every core; finished jobs kept for polling
+    simulation_workers: int = 0
+    simulation_sites_per_chunk: int = 2_000
+    job_history_size: int = 100
 
     @property
     def target_db_url(self) -> str:
@@ -15,6 +43,11 @@ class Settings(BaseSettings):
             return str(self.db_test_url)
         return str(self.db_url)
 
+    @property
+    def target_replica_url(self) -> str | None:
+        url = self.db_test_replica_url if os.getenv("ENV") == "TESTING" else self.db_replica_url
+        return str(url) if url else None
+
     class Config:
         env_file = ".env"
         extra = "ignore"
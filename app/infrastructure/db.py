@@ -1,16 +1,199 @@
-from collections.abc import AsyncGenerator
+import logging
+import time
+import uuid
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
 
-from config import get_settings
+from config import Settings, get_settings
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 Base = declarative_base()
-engine = create_async_engine(get_settings().target_db_url)
+logger = logging.getLogger(__name__)
+
+# Set on the responses to writes, keeps the client's reads on the primary while present
+PRIMARY_PIN_COOKIE = "read_primary"
+
+
+# Counters of InstrumentedPool, carried over when the pool is recreated
+POOL_COUNTERS = (
+    "checkouts",
+    "timeouts",
+    "wait_seconds_total",
+    "wait_seconds_max",
+    "connects",
+    "connect_seconds_total",
+    "connect_seconds_max",
+)
+
+# Set during a checkout, per task: QueuePool._do_get retries by calling itself, within the same one
+_in_checkout: ContextVar[bool] = ContextVar("in_checkout", default=False)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long checkouts wait for a connection.
+
+    The wait is the time spent queuing for a connection to be given back; opening a new one
+    when the pool grows is reported apart, as `connects` and `connect_seconds_*`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        record.connect_seconds = time.perf_counter() - started
+        return record
+
+    def _do_get(self):
+        if _in_checkout.get():
+            return super()._do_get()
+        token = _in_checkout.set(True)
+        started = time.perf_counter()
+        connect_seconds = 0.0
+        try:
+            record = super()._do_get()
+            # Only set on the records opened by this checkout
+            connect_seconds = record.__dict__.pop("connect_seconds", 0.0)
+            return record
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            _in_checkout.reset(token)
+            waited = time.perf_counter() - started - connect_seconds
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if connect_seconds:
+                self.connects += 1
+                self.connect_seconds_total += connect_seconds
+                self.connect_seconds_max = max(self.connect_seconds_max, connect_seconds)
+
+    def recreate(self):
+        # Keep counting across the pool being recreated (dispose, invalidation)
+        pool = super().recreate()
+        pool.__dict__.update({counter: getattr(self, counter) for counter in POOL_COUNTERS})
+        return pool
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "connects": self.connects,
+            "connect_seconds_total": round(self.connect_seconds_total, 6),
+            "connect_seconds_max": round(self.connect_seconds_max, 6),
+        }
+
+
+def engine_options(settings: Settings) -> dict[str, Any]:
+    """Pool and driver options of the engine, from the settings."""
+    connect_args: dict[str, Any] = {
+        # SQLAlchemy's cache of asyncpg prepared statements, per connection
+        "prepared_statement_cache_size": settings.db_statement_cache_size
+    }
+    if settings.db_pgbouncer:
+        # A server connection serves many clients: prepared statements must neither be reused
+        # from a previous transaction nor collide on asyncpg's sequential names
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    return {
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+engine = create_async_engine(get_settings().target_db_url, **engine_options(get_settings()))
 
 
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
+        try:
+            yield session
+        finally:
+            # Set by BaseService.commit, tells the middleware to pin the client to the primary
+            request.state.committed = session.info.get("committed", False)
+
+
+class ReadRouter:
+    """Chooses between the replica and the primary for read-only sessions."""
+
+    def __init__(self, replica: async_sessionmaker | None, retry_seconds: float):
+        self.replica = replica
+        self.retry_seconds = retry_seconds
+        self.replica_down_until = 0.0
+
+    def use_replica(self, request: Request) -> bool:
+        return (
+            self.replica is not None
+            and PRIMARY_PIN_COOKIE not in request.cookies
+            and time.monotonic() >= self.replica_down_until
+        )
+
+    @asynccontextmanager
+    async def session(self, request: Request) -> AsyncIterator[AsyncSession]:
+        """A replica session when possible, a primary one otherwise.
+
+        Replica sessions are flagged with `info["replica"]` so lagging data is not cached.
+        """
+        if self.use_replica(request):
+            async with self.replica() as session:
+                try:
+                    await session.connection()
+                except (DBAPIError, OSError):
+                    logger.warning("Replica unavailable, reading from the primary", exc_info=True)
+                    self.replica_down_until = time.monotonic() + self.retry_seconds
+                else:
+                    session.info["replica"] = True
+                    yield session
+                    return
+        async with async_session_maker() as session:
+            yield session
+
+
+def create_read_router(settings: Settings) -> ReadRouter:
+    replica_url = settings.target_replica_url
+    replica = None
+    if replica_url:
+        replica_engine = create_async_engine(replica_url, **engine_options(settings))
+        replica = async_sessionmaker(replica_engine, expire_on_commit=False, class_=AsyncSession)
+    return ReadRouter(replica, settings.db_replica_retry_seconds)
+
+
+read_router = create_read_router(get_settings())
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes, see `ReadRouter`."""
+    async with read_router.session(request) as session:
         yield session
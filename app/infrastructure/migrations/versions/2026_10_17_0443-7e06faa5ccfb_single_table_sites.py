@@ -0,0 +1,71 @@
+"""single table sites
+
+Revision ID: 7e06faa5ccfb
+Revises: 05afcdd69af4
+Create Date: 2026-10-17 04:43:59.979910
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7e06faa5ccfb"
+down_revision: Union[str, None] = "05afcdd69af4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("sites", sa.Column("useful_energy_at_1_megawatt", sa.Float(), nullable=True))
+    op.add_column("sites", sa.Column("efficiency", sa.Float(), nullable=True))
+    # Move the country specific columns onto sites before dropping the joined tables
+    op.execute(
+        "UPDATE sites SET useful_energy_at_1_megawatt = french_sites.useful_energy_at_1_megawatt "
+        "FROM french_sites WHERE french_sites.id = sites.id"
+    )
+    op.execute(
+        "UPDATE sites SET efficiency = italian_sites.efficiency "
+        "FROM italian_sites WHERE italian_sites.id = sites.id"
+    )
+    op.create_check_constraint(
+        "ck_sites_fr_useful_energy",
+        "sites",
+        "country <> 'fr' OR useful_energy_at_1_megawatt IS NOT NULL",
+    )
+    op.create_check_constraint(
+        "ck_sites_it_efficiency", "sites", "country <> 'it' OR efficiency IS NOT NULL"
+    )
+    op.drop_table("italian_sites")
+    op.drop_table("french_sites")
+
+
+def downgrade() -> None:
+    op.create_table(
+        "french_sites",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("useful_energy_at_1_megawatt", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["id"], ["sites.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "italian_sites",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("efficiency", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["id"], ["sites.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(
+        "INSERT INTO french_sites (id, useful_energy_at_1_megawatt) "
+        "SELECT id, useful_energy_at_1_megawatt FROM sites WHERE country = 'fr'"
+    )
+    op.execute(
+        "INSERT INTO italian_sites (id, efficiency) "
+        "SELECT id, efficiency FROM sites WHERE country = 'it'"
+    )
+    op.drop_constraint("ck_sites_it_efficiency", "sites", type_="check")
+    op.drop_constraint("ck_sites_fr_useful_energy", "sites", type_="check")
+    op.drop_column("sites", "efficiency")
+    op.drop_column("sites", "useful_energy_at_1_megawatt")
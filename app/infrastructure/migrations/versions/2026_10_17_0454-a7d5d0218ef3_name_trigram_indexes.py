@@ -0,0 +1,51 @@
+"""name trigram indexes
+
+Revision ID: a7d5d0218ef3
+Revises: 469e6a98ae75
+Create Date: 2026-10-17 04:54:12.412718
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d5d0218ef3"
+down_revision: Union[str, None] = "469e6a98ae75"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def trigram_available() -> bool:
+    query = sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    return op.get_bind().scalar(query) is not None
+
+
+def upgrade() -> None:
+    # Without pg_trgm, `?q=` searches fall back to unindexed ILIKE matching
+    if not trigram_available():
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_groups_name_trgm",
+        "groups",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_sites_name_trgm",
+        "sites",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_sites_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_groups_name_trgm")
@@ -1,17 +1,83 @@
 from typing import ClassVar
 
 from infrastructure.db import Base
-from sqlalchemy import Column, Date, Enum, Float, ForeignKey, Integer, String, Table
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    CheckConstraint,
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.orm import relationship
 
 from .enums import GroupType
 
+FRENCH_INSTALLATION_DATE_INDEX = "uq_sites_fr_installation_date"
+
+
+def trigram_available(ddl, target, bind, **kw) -> bool:
+    """Whether the pg_trgm extension can be installed, name search degrades without it."""
+    query = text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    return bind.scalar(query) is not None
+
+
+def trigram_index(name: str, column: str) -> Index:
+    """GIN trigram index serving `?q=` searches, only created where pg_trgm is available."""
+    index = Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+    return index.ddl_if(callable_=trigram_available)
+
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(callable_=trigram_available),
+)
+
 group_group_association = Table(
     "group_group_association",
     Base.metadata,
     Column("parent_group_id", Integer, ForeignKey("groups.id"), primary_key=True),
     Column("child_group_id", Integer, ForeignKey("groups.id"), primary_key=True),
 )
+# Transitive closure of group_group_association: one row per (ancestor, descendant) pair at
+# the length of the shortest path between them, including a depth 0 row for every group.
+group_closure = Table(
+    "group_closure",
+    Base.metadata,
+    Column("ancestor_id", Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True),
+    Column("depth", Integer, nullable=False),
+    Index("ix_group_closure_descendant_id", "descendant_id"),
+)
+# Capacity of the sites in each group and its descendants, kept current by BaseService.commit
+group_stats = Table(
+    "group_stats",
+    Base.metadata,
+    Column("group_id", Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True),
+    Column("site_count", Integer, nullable=False),
+    Column("max_power_megawatt_sum", Float, nullable=False),
+    Column("min_power_megawatt_sum", Float, nullable=False),
+    Column("useful_energy_at_1_megawatt_sum", Float, nullable=False),
+)
+# Counter bumped by BaseService.commit whenever rows of a table change, the listings derive
+# their ETag from it and the table's highest id instead of scanning the matching rows
+listing_versions = Table(
+    "listing_versions",
+    Base.metadata,
+    Column("table_name", String, primary_key=True),
+    Column("version", BigInteger, nullable=False),
+)
 # Association table for many-to-many between sites and groups
 site_group_association = Table(
     "site_group_association",
@@ -27,6 +93,15 @@ class Group(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     type = Column(Enum(GroupType), nullable=False)
+    # Bumped whenever the group representation changes, see BaseService.touch
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # `name__prefix` filters (LIKE 'value%') whatever the database collation
+        Index("ix_groups_name_pattern", name, postgresql_ops={"name": "text_pattern_ops"}),
+        trigram_index("ix_groups_name_trgm", "name"),
+    )
 
     sites = relationship("Site", secondary=site_group_association, back_populates="groups")
     child_groups = relationship(
@@ -48,10 +123,36 @@ class Site(Base):
     max_power_megawatt = Column(Float, nullable=False)
     min_power_megawatt = Column(Float, nullable=False)
     country = Column(String, nullable=False)
-
+    # Bumped whenever the site representation changes, see BaseService.touch
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # Only one French site can be installed per day
+        Index(
+            FRENCH_INSTALLATION_DATE_INDEX,
+            installation_date,
+            unique=True,
+            postgresql_where=country == "fr",
+        ),
+        # Listing filters, see QueryBuilder.filter
+        Index("ix_sites_name_pattern", name, postgresql_ops={"name": "text_pattern_ops"}),
+        trigram_index("ix_sites_name_trgm", "name"),
+        Index("ix_sites_country_installation_date", country, installation_date),
+        Index("ix_sites_installation_date", installation_date),
+        Index("ix_sites_max_power_megawatt", max_power_megawatt),
+        # Country specific columns are nullable in the table, required per country here
+        CheckConstraint(
+            "country <> 'fr' OR useful_energy_at_1_megawatt IS NOT NULL",
+            name="ck_sites_fr_useful_energy",
+        ),
+        CheckConstraint("country <> 'it' OR efficiency IS NOT NULL", name="ck_sites_it_efficiency"),
+    )
     __mapper_args__: ClassVar[dict] = {
         "polymorphic_on": "country",
         "polymorphic_identity": "generic",
+        # Load every country's columns whatever class is queried, they are on the same row
+        "with_polymorphic": "*",
     }
 
     groups = relationship(
@@ -59,18 +160,15 @@ class Site(Base):
     )
 
 
+# Country specific sites use single-table inheritance: their columns live on `sites`, so
+# reading any mix of countries never joins.
 class FrenchSite(Site):
-    __tablename__ = "french_sites"
-    id = Column(Integer, ForeignKey("sites.id"), primary_key=True)
     useful_energy_at_1_megawatt = Column(Float)
 
     __mapper_args__: ClassVar[dict] = {"polymorphic_identity": "fr"}
 
 
 class ItalianSite(Site):
-    __tablename__ = "italian_sites"
-
-    id = Column(Integer, ForeignKey("sites.id"), primary_key=True)
-    efficiency = Column(Float, nullable=False)
+    efficiency = Column(Float)
 
     __mapper_args__: ClassVar[dict] = {"polymorphic_identity": "it"}
@@ -1,6 +1,42 @@
+from contextlib import asynccontextmanager
+
 from api import api_router
-from fastapi import FastAPI
+from config import get_settings
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from infrastructure.db import PRIMARY_PIN_COOKIE, read_router
+from services.jobs import shutdown_process_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    shutdown_process_pool()
+
+
+app = FastAPI(
+    title="Python technical test", default_response_class=ORJSONResponse, lifespan=lifespan
+)
+
+
+@app.middleware("http")
+async def pin_writers_to_primary(request: Request, call_next):
+    """Send the reads of a client that just wrote to the primary, the replica may lag.
+
+    Only requests that committed a write pin the client, read-only POSTs such as estimates
+    leave it on the replica.
+    """
+    response = await call_next(request)
+    written = getattr(request.state, "committed", False) and response.status_code < 400
+    if written and read_router.replica is not None:
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            "1",
+            max_age=get_settings().db_primary_pin_seconds,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
 
-app = FastAPI(title="Python technical test")
 
 app.include_router(api_router)
@@ -1,13 +1,53 @@
-from schemas.group import GroupCreate, GroupOut, GroupUpdate
-from schemas.site import SiteCreate, SiteOut, SiteUpdate
+from schemas.group import (
+    GroupBulkUpdate,
+    GroupCreate,
+    GroupMemberCounts,
+    GroupMembershipChange,
+    GroupMembershipResult,
+    GroupOut,
+    GroupRelative,
+    GroupStats,
+    GroupTreeNode,
+    GroupUpdate,
+)
+from schemas.site import (
+    BulkChangeResult,
+    SimulationJob,
+    SimulationRequest,
+    SiteBulkResult,
+    SiteBulkUpdate,
+    SiteCreate,
+    SiteEstimate,
+    SiteEstimateRequest,
+    SiteOut,
+    SiteScope,
+    SiteStats,
+    SiteUpdate,
+)
 
 __all__ = [
     # Group
     "GroupCreate",
     "GroupUpdate",
     "GroupOut",
+    "GroupRelative",
+    "GroupTreeNode",
+    "GroupStats",
+    "GroupBulkUpdate",
+    "GroupMemberCounts",
+    "GroupMembershipChange",
+    "GroupMembershipResult",
     # Site
     "SiteCreate",
     "SiteUpdate",
     "SiteOut",
+    "SiteBulkResult",
+    "SiteBulkUpdate",
+    "BulkChangeResult",
+    "SiteStats",
+    "SiteScope",
+    "SiteEstimateRequest",
+    "SiteEstimate",
+    "SimulationRequest",
+    "SimulationJob",
 ]
@@ -1,9 +1,11 @@
 from typing import List, Optional
 
 from infrastructure.models import GroupType
-from pydantic import BaseModel, Field, constr
+from pydantic import BaseModel, Field, constr, model_validator
 from schemas.site import SiteSummary
 
+MAX_MEMBERSHIP_CHANGE = 10000
+
 
 class GroupBase(BaseModel):
     name: constr(min_length=1)
@@ -35,6 +37,22 @@ class GroupUpdate(BaseModel):
         return values
 
 
+class GroupBulkUpdate(BaseModel):
+    """Values written on every group matching the filters of a bulk update."""
+
+    name: constr(min_length=1) | None = None
+    type: GroupType | None = None
+
+    @model_validator(mode="after")
+    def validate_one_field(self) -> "GroupBulkUpdate":
+        if not self.model_fields_set:
+            raise ValueError("At least one field must be provided to update the groups.")
+        for field in sorted(self.model_fields_set):
+            if getattr(self, field) is None:
+                raise ValueError(f"Field '{field}' cannot be null")
+        return self
+
+
 class GroupSummary(BaseModel):
     id: int
     name: str
@@ -42,6 +60,55 @@ class GroupSummary(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class GroupRelative(GroupSummary):
+    """A descendant or ancestor of a group or site, `depth` levels away from it."""
+
+    type: GroupType
+    depth: int
+
+
+class GroupStats(BaseModel):
+    """Capacity of the sites in a group and its descendants, each site counted once."""
+
+    group_id: int
+    site_count: int
+    max_power_megawatt_sum: float
+    min_power_megawatt_sum: float
+    useful_energy_at_1_megawatt_sum: float
+
+    model_config = {"from_attributes": True}
+
+
+class GroupMembershipChange(BaseModel):
+    """Ids of the sites or child groups to add to a group or remove from it."""
+
+    ids: List[int] = Field(min_length=1, max_length=MAX_MEMBERSHIP_CHANGE)
+
+
+class GroupMembershipResult(BaseModel):
+    """Ids whose membership changed, the others already were in the requested state."""
+
+    group_id: int
+    changed: List[int]
+
+
+class GroupTreeNode(BaseModel):
+    id: int
+    name: str
+    type: GroupType
+    children: List["GroupTreeNode"] = Field(default_factory=list)
+
+
+class GroupMemberCounts(GroupBase):
+    """A group with the number of its direct members instead of their lists."""
+
+    id: int
+    site_count: int
+    child_group_count: int
+
+    model_config = {"from_attributes": True}
+
+
 class GroupOut(GroupBase):
     id: int
     child_groups: List[GroupSummary] | None = None
@@ -51,3 +118,4 @@ class GroupOut(GroupBase):
 
 
 GroupOut.model_rebuild()
+GroupTreeNode.model_rebuild()
@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 from typing import Annotated, List, Literal, Optional
 
 from pydantic import BaseModel, Field, constr, model_validator
@@ -47,6 +47,39 @@ class SiteUpdate(BaseModel):
     groups: list[int] | None = None
 
 
+class SiteBulkUpdate(BaseModel):
+    """Values written on every site matching the filters of a bulk update."""
+
+    name: constr(min_length=1) | None = None
+    installation_date: date | None = None
+    max_power_megawatt: float | None = None
+    min_power_megawatt: float | None = None
+    useful_energy_at_1_megawatt: float | None = None
+    efficiency: float | None = None
+
+    @model_validator(mode="after")
+    def validate_one_field(self) -> "SiteBulkUpdate":
+        if not self.model_fields_set:
+            raise ValueError("At least one field must be provided to update the sites.")
+        for field in sorted(self.model_fields_set):
+            if getattr(self, field) is None:
+                raise ValueError(f"Field '{field}' cannot be null")
+        return self
+
+
+class BulkChangeResult(BaseModel):
+    """Number of rows a bulk update or delete changed, or would change on a dry run."""
+
+    affected: int
+    dry_run: bool
+
+
+class SiteBulkResult(BaseModel):
+    index: int
+    id: int | None = None
+    error: str | None = None
+
+
 class SiteSummary(BaseModel):
     id: int
     name: str
@@ -71,3 +104,85 @@ class ItalianSiteOut(BaseSite):
 
 
 SiteOut = Annotated[FrenchSiteOut | ItalianSiteOut, Field(discriminator="country")]
+
+
+class SiteStats(BaseModel):
+    """Aggregates over the sites sharing the `group_by` keys, a null key spanning all values."""
+
+    country: str | None = None
+    month: str | None = None
+    group_id: int | None = None
+    site_count: int
+    max_power_megawatt_sum: float
+    max_power_megawatt_min: float
+    max_power_megawatt_max: float
+    min_power_megawatt_sum: float
+    min_power_megawatt_min: float
+    min_power_megawatt_max: float
+    # French and Italian attributes, null when no such site is aggregated
+    useful_energy_at_1_megawatt_sum: float | None = None
+    useful_energy_at_1_megawatt_min: float | None = None
+    useful_energy_at_1_megawatt_max: float | None = None
+    efficiency_avg: float | None = None
+    efficiency_min: float | None = None
+    efficiency_max: float | None = None
+
+
+class SiteScope(BaseModel):
+    """Sites a computation runs over, all of them by default."""
+
+    group_id: int | None = Field(None, description="Only the sites in this group or below it")
+    filters: dict[str, str] = Field(
+        default_factory=dict, description="Listing filters, e.g. {'max_power_megawatt__gt': '5'}"
+    )
+
+
+class SiteEstimateRequest(SiteScope):
+    hours: float = Field(24.0, gt=0, description="Length of the production period")
+    load_factor: float = Field(
+        1.0, ge=0, le=1, description="Operating point between minimum (0) and maximum (1) power"
+    )
+
+
+class CountryEstimate(BaseModel):
+    site_count: int
+    expected_energy_megawatt_hour: float
+    max_power_megawatt: float
+
+
+class SiteEstimate(BaseModel):
+    site_count: int
+    expected_energy_megawatt_hour: float
+    countries: dict[str, CountryEstimate]
+
+
+MAX_SIMULATION_DAYS = 20 * 366
+
+
+class SimulationRequest(SiteScope):
+    start: date
+    days: int = Field(365, ge=1, le=MAX_SIMULATION_DAYS)
+    curtailment: float = Field(
+        0.0, ge=0, le=1, description="Operating point between maximum (0) and minimum (1) power"
+    )
+    degradation_per_year: float = Field(
+        0.005, ge=0, lt=1, description="Output lost every year since installation"
+    )
+
+
+class SimulationResult(BaseModel):
+    start: date
+    days: int
+    # Daily energy in MWh from `start`, per country and per group (including child groups)
+    countries: dict[str, list[float]]
+    groups: dict[int, list[float]]
+
+
+class SimulationJob(BaseModel):
+    id: str
+    status: Literal["pending", "running", "done", "failed"]
+    created_at: datetime
+    error: str | None = None
+    result: SimulationResult | None = None
+
+    model_config = {"from_attributes": True}
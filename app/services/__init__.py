@@ -4,12 +4,13 @@ Service layer package for the application.
 This package contains:
 - BaseService: Base class for all services with common CRUD operations
 - QueryBuilder: Utility for building dynamic database queries
+- Page: One keyset-paginated page of a listing
 - SiteService: Service for managing sites with business rules
 - GroupService: Service for managing groups with business rules
 """
 
-from services.base import BaseService, QueryBuilder
+from services.base import BaseService, Page, QueryBuilder
 from services.groups import GroupService
 from services.sites import SiteService
 
-__all__ = ["BaseService", "QueryBuilder", "SiteService", "GroupService"]
+__all__ = ["BaseService", "Page", "QueryBuilder", "SiteService", "GroupService"]
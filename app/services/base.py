@@ -1,55 +1,373 @@
-from typing import Any, Generic, TypeVar
+import base64
+import binascii
+import json
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date
+from enum import Enum
+from typing import Any, ClassVar, Generic, Literal, TypeVar
 
-from sqlalchemy import and_, asc, desc
+from fastapi import HTTPException
+from infrastructure.models import Group, Site
+from infrastructure.models.site_group import (
+    group_closure,
+    group_stats,
+    listing_versions,
+    site_group_association,
+)
+from sqlalchemy import (
+    Boolean,
+    Float,
+    Integer,
+    and_,
+    any_,
+    asc,
+    bindparam,
+    case,
+    desc,
+    func,
+    inspect,
+    literal,
+    or_,
+    text,
+    tuple_,
+    type_coerce,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy.orm.util import AliasedClass
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import AliasedClass, identity_key
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from .cache import group_cache, site_cache
+from .loader import session_loader
 
 T = TypeVar("T")
 OutSchema = TypeVar("OutSchema")
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+GROUPS_NOT_FOUND_ERROR = "One or more groups not found."
+SITES_NOT_FOUND_ERROR = "One or more sites not found."
+STREAM_BATCH_SIZE = 1000
+
+# How the total of a listing is computed, see `BaseService.count_with_filters`
+CountMode = Literal["exact", "estimated", "none"]
+
+# Site columns summed per group in `group_stats`
+STATS_COLUMNS = ("max_power_megawatt", "min_power_megawatt", "useful_energy_at_1_megawatt")
+
+
+def group_membership(group_ids=None):
+    """Distinct (group_id, site_id) pairs of the sites in each group or below it."""
+    stmt = (
+        select(group_closure.c.ancestor_id.label("group_id"), site_group_association.c.site_id)
+        .join(group_closure, group_closure.c.descendant_id == site_group_association.c.group_id)
+        .distinct()
+    )
+    if group_ids is not None:
+        stmt = stmt.where(group_closure.c.ancestor_id.in_(group_ids))
+    return stmt
+
+
+def ancestor_ids(group_ids: Iterable[int]):
+    """Ids of the given groups and of every group above them."""
+    return select(group_closure.c.ancestor_id).where(
+        group_closure.c.descendant_id.in_(list(group_ids))
+    )
+
+
+def site_ids_below(group_ids: Iterable[int]):
+    """Ids of the sites in the given groups or below them."""
+    return (
+        select(site_group_association.c.site_id)
+        .join(group_closure, group_closure.c.descendant_id == site_group_association.c.group_id)
+        .where(group_closure.c.ancestor_id.in_(list(group_ids)))
+    )
+
+
+def schema_columns(table, *schemas: type) -> list:
+    """Columns of `table` read by any of the output `schemas`."""
+    fields = {name for schema in schemas for name in schema.model_fields}
+    return [column for column in table.columns if column.key in fields]
+
+
+@dataclass
+class Page(Generic[OutSchema]):
+    """One page of a listing and the cursor pointing at the next one."""
+
+    items: list[OutSchema]
+    next_cursor: str | None = None
+
+
+def encode_cursor(sort_field: str, value: Any, record_id: int) -> str:
+    """Encode the keyset position of a record into an opaque cursor."""
+    if isinstance(value, Enum):
+        value = value.value
+    elif isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps([sort_field, value, record_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, Any, int]:
+    """Decode a cursor produced by `encode_cursor`."""
+    try:
+        sort_field, value, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.") from exc
+    if not isinstance(sort_field, str) or not isinstance(record_id, int):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+    return sort_field, value, record_id
+
+
+def coerce_value(column_type, value: Any) -> Any:
+    """Convert a JSON or query string value to the Python type of a column."""
+    python_type = column_type.python_type
+    if issubclass(python_type, date):
+        return python_type.fromisoformat(value)
+    if python_type is bool and isinstance(value, str):
+        if value.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(value)
+        return value.lower() in ("true", "1")
+    return python_type(value)
+
+
+FILTER_SEPARATOR = "__"
+# Operator -> (number of values, 0 for a comma separated list; condition builder)
+FILTER_OPERATORS: dict[str, tuple[int, Callable]] = {
+    "eq": (1, lambda column, value: column == value),
+    "ne": (1, lambda column, value: column != value),
+    "lt": (1, lambda column, value: column < value),
+    "lte": (1, lambda column, value: column <= value),
+    "gt": (1, lambda column, value: column > value),
+    "gte": (1, lambda column, value: column >= value),
+    "in": (0, lambda column, values: column.in_(values)),
+    "between": (2, lambda column, values: column.between(*values)),
+    # LIKE 'value%' with wildcards escaped, served by the text_pattern_ops indexes
+    "prefix": (1, lambda column, value: column.startswith(value, autoescape=True)),
+    "isnull": (1, lambda column, value: column.is_(None) if value else column.is_not(None)),
+}
+
+
+FILTER_HELP = (
+    "Any column can be filtered with `field__operator=value` query parameters, operators: "
+    + ", ".join(f"`{operator}`" for operator in FILTER_OPERATORS)
+    + ". `in` takes comma separated values, `between` two of them "
+    + "(e.g. `installation_date__between=2024-04-01,2024-06-30`)."
+)
+
+
+def operator_filters(params: Mapping[str, str]) -> dict[str, str]:
+    """The `field__operator` filters among query parameters."""
+    return {key: value for key, value in params.items() if FILTER_SEPARATOR in key}
+
+
+class Explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a statement: its plan, without running it."""
+
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
 
 class QueryBuilder:
     def __init__(self, model_class, load_rel=None):
         self.model_class = model_class
         self.stmt = select(model_class)
         self.conditions = []
+        self.sort_name = "id"
         self.sort_field = None
         self.sort_order = asc
         self.load_rel = load_rel
+        self.limit = None
+        self.after = None
+        self.columns = None
 
     def filter(self, field: str, value: Any):
-        """Add a filter condition"""
+        """Add a filter condition, `field` may carry an operator suffix (e.g. `name__prefix`)"""
         if value is None:
             return self
 
-        column = getattr(self.model_class, field, None)
+        name, _, operator = field.partition(FILTER_SEPARATOR)
+        operator = operator or "eq"
+        column = self._column(name)
         if column is None:
-            return self
-        condition = column == value
+            raise HTTPException(status_code=400, detail=f"Unknown filter field: {name}.")
+        if operator not in FILTER_OPERATORS:
+            raise HTTPException(status_code=400, detail=f"Unknown filter operator: {operator}.")
+        arity, build_condition = FILTER_OPERATORS[operator]
+        if operator == "prefix" and column.type.python_type is not str:
+            raise HTTPException(status_code=400, detail=f"Filter {field} needs a text field.")
+
+        # Booleans for isnull, the column type otherwise
+        value_type = Boolean() if operator == "isnull" else column.type
+        if arity == 1:
+            value = self._coerce(value_type, field, value)
+        else:
+            if isinstance(value, str):
+                values = value.split(",") if value else []
+            else:
+                values = value
+            if arity == 2 and len(values) != 2:
+                raise HTTPException(
+                    status_code=400, detail=f"Filter {field} expects two comma separated values."
+                )
+            if not values:
+                raise HTTPException(
+                    status_code=400, detail=f"Filter {field} expects at least one value."
+                )
+            value = [self._coerce(value_type, field, item) for item in values]
+        self.conditions.append(build_condition(column, value))
+        return self
+
+    def _column(self, name: str):
+        """Table column rather than mapped attribute, so subclass columns are reachable too"""
+        return inspect(self.model_class).mapper.local_table.columns.get(name)
+
+    def search(self, term: str, trigram: bool):
+        """Keep the records whose name matches `term`, best matches first unless sorted"""
+        column = self._column("name")
+        if trigram:
+            # `name %> term`: a word of name is similar to term, both served by the GIN index
+            condition = or_(column.op("%>")(term), column.icontains(term, autoescape=True))
+            rank = func.word_similarity(term, column)
+        else:
+            condition = column.icontains(term, autoescape=True)
+            rank = case(
+                (func.lower(column) == term.lower(), 1.0),
+                (column.istartswith(term, autoescape=True), 0.5),
+                else_=0.0,
+            )
         self.conditions.append(condition)
+        if self.sort_field is None:
+            self.sort_field = type_coerce(rank, Float).label("rank")
+            self.sort_order = desc
+            self.sort_name = "-rank"
+        return self
+
+    @staticmethod
+    def _coerce(value_type, field: str, value: Any) -> Any:
+        """Convert a query string value to `value_type`"""
+        if not isinstance(value, str):
+            return value
+        try:
+            return coerce_value(value_type, value)
+        except (TypeError, ValueError) as exc:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid value for filter {field}: {value!r}."
+            ) from exc
+
+    def where(self, *conditions):
+        """Add raw SQL conditions"""
+        self.conditions.extend(conditions)
         return self
 
     def sort(self, field: str, order: str = "asc"):
-        """Add sorting"""
-        column = getattr(self.model_class, field, None)
+        """Add sorting on a column, resolved like the filters"""
+        column = self._column(field)
         if column is None:
-            return self
+            raise HTTPException(status_code=400, detail=f"Unknown sort field: {field}.")
 
         self.sort_field = column
         self.sort_order = desc if order.lower() == "desc" else asc
+        self.sort_name = f"-{field}" if self.sort_order is desc else field
+        return self
+
+    def paginate(self, limit: int | None = None, after: str | None = None):
+        """Restrict the query to the page of `limit` rows following the `after` cursor"""
+        self.limit = limit
+        self.after = after
         return self
 
+    def project(self, *columns):
+        """Select `columns` as plain rows instead of ORM entities"""
+        self.columns = columns
+        self.stmt = select(*columns)
+        return self
+
+    def _keyset_condition(self, id_column):
+        """Translate the `after` cursor into a row comparison on (sort field, id)"""
+        sort_name, value, record_id = decode_cursor(self.after)
+        if sort_name != self.sort_name:
+            raise HTTPException(
+                status_code=400, detail="Pagination cursor does not match the sort parameter."
+            )
+        sort_column = self.sort_field if self.sort_field is not None else id_column
+        try:
+            if value is not None:
+                value = coerce_value(sort_column.type, value)
+        except (TypeError, ValueError) as exc:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor.") from exc
+
+        position = tuple_(sort_column, id_column)
+        if self.sort_order is desc:
+            after = position < tuple_(value, record_id)
+        else:
+            after = position > tuple_(value, record_id)
+        if not getattr(sort_column, "nullable", False):
+            return after
+        # NULLs sort last ascending and first descending, and never compare in a tuple
+        if self.sort_order is asc:
+            if value is None:
+                return and_(sort_column.is_(None), id_column > record_id)
+            return or_(after, sort_column.is_(None))
+        if value is None:
+            return or_(and_(sort_column.is_(None), id_column < record_id), sort_column.is_not(None))
+        return after
+
+    def build_aggregate(self, *columns):
+        """Build a query computing `columns` over the filtered rows, ignoring pagination"""
+        stmt = select(*columns).select_from(self.model_class)
+        if self.conditions:
+            stmt = stmt.where(and_(*self.conditions))
+        return stmt
+
     def build(self):
         """Build the final query"""
+        id_column = self.model_class.id
+        if self.after:
+            self.conditions.append(self._keyset_condition(id_column))
+
         if self.conditions:
             self.stmt = self.stmt.where(and_(*self.conditions))
 
-        if self.sort_field:
-            self.stmt = self.stmt.order_by(self.sort_order(self.sort_field))
+        # Always break ties on the primary key so pages are stable.
+        if self.sort_field is not None:
+            order = self.sort_order(self.sort_field)
+            if getattr(self.sort_field, "nullable", False):
+                # PostgreSQL's default placement, spelled out for the keyset condition
+                order = order.nulls_last() if self.sort_order is asc else order.nulls_first()
+            self.stmt = self.stmt.order_by(order)
+        self.stmt = self.stmt.order_by(self.sort_order(id_column))
+
+        if self.columns is not None:
+            # The keyset cursor reads the sort value and the id from the last row
+            selected = {column.key for column in self.columns}
+            extra = [
+                column
+                for column in (self.sort_field, id_column)
+                if column is not None and column.key not in selected
+            ]
+            self.stmt = self.stmt.add_columns(*extra)
 
-        if self.load_rel:
+        if self.limit:
+            # Fetch one extra row to know whether another page follows.
+            self.stmt = self.stmt.limit(self.limit + 1)
+
+        # Relationships only apply to ORM entities, projected rows load their own
+        if self.load_rel and self.columns is None:
             relationship_options = [
                 selectinload(getattr(self.model_class, rel)) for rel in self.load_rel
             ]
@@ -57,24 +375,302 @@ class QueryBuilder:
             return self.stmt.options(*relationship_options)
         return self.stmt
 
+    def page(self, records: list) -> Page:
+        """Trim the extra row fetched by `build` and compute the next cursor"""
+        if not self.limit or len(records) <= self.limit:
+            return Page(items=list(records))
+        records = list(records[: self.limit])
+        last = records[-1]
+        # Country specific columns are only mapped on their subclass, NULL for the others
+        value = getattr(last, self.sort_name.lstrip("-"), None)
+        cursor = encode_cursor(self.sort_name, value, last.id)
+        return Page(items=records, next_cursor=cursor)
+
+
+def parse_field_list(value: str | None, allowed: Iterable[str], parameter: str) -> list[str] | None:
+    """Split a comma separated query parameter, rejecting names outside `allowed`."""
+    if value is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {parameter}: {', '.join(unknown)}.")
+    return names
+
 
 class BaseService(Generic[T, OutSchema]):
+    # Relationship name -> (owner column, related column, related model) of its association
+    # table, used to expand listing rows
+    relation_summaries: ClassVar[dict[str, tuple]] = {}
+    # Installed database extensions, shared by every service
+    _extensions: ClassVar[dict[str, bool]] = {}
+
     def __init__(self, db: AsyncSession, model_class: type[T | AliasedClass[T]], relations=None):
         self.db = db
         self.model_class = model_class
         self.relations = relations
 
+    def touch(
+        self,
+        site_ids: Iterable[int] = (),
+        group_ids: Iterable[int] = (),
+        tables: Iterable[str] = (),
+    ) -> None:
+        """Mark the entities whose representation changes with the pending write.
+
+        `commit` bumps their version and the listing version of their table in the same
+        transaction and evicts them from the read cache once it succeeds. `tables` marks rows
+        inserted without the ORM, entities added to the session are detected by `commit`.
+        """
+        touched_sites, touched_groups, touched_tables = self.db.info.setdefault(
+            "touched", (set(), set(), set())
+        )
+        touched_sites.update(site_ids)
+        touched_groups.update(group_ids)
+        touched_tables.update(tables)
+
+    def mark_stats(self, sites=None, group_ids: Iterable[int] = ()) -> None:
+        """Mark the `group_stats` rows to bring up to date on `commit`.
+
+        The contribution of `sites`, ids or a query of them, is added to every group they are
+        in, after `retract_stats` took it out before the write. `group_ids` and their
+        ancestors are recomputed, for writes reshaping a group wholesale.
+        """
+        stats_sites, stats_groups = self.db.info.setdefault("stats", ([], set()))
+        if sites is not None:
+            stats_sites.append(sites)
+        stats_groups.update(group_ids)
+
+    def retract_stats(self, sites, stmt=None):
+        """`stmt` also taking the contribution of `sites`, ids or a query of them, out of the
+        `group_stats` of their groups, as it is before `stmt` runs; the retraction alone when
+        `stmt` is None.
+
+        Retracting the sites a write changes before it and adding them back on `commit` keeps
+        the totals current for the cost of the changed sites, whatever the size of their
+        groups. Call `mark_stats` with the same sites, once per commit.
+        """
+        retraction = self.stats_delta([sites], -1)
+        if stmt is None:
+            return retraction
+        return stmt.add_cte(retraction.returning(group_stats.c.group_id).cte("retracted_stats"))
+
+    async def get_groups_by_ids(self, group_ids: Iterable[int]) -> list[Group]:
+        """Groups of `group_ids` loaded once per session, 404 when any is missing."""
+        groups = await session_loader(self.db, Group).load_many(group_ids)
+        if None in groups:
+            raise HTTPException(status_code=404, detail=GROUPS_NOT_FOUND_ERROR)
+        return groups
+
+    async def get_sites_by_ids(self, site_ids: Iterable[int]) -> list[Site]:
+        """Sites of `site_ids` loaded once per session, 404 when any is missing."""
+        sites = await session_loader(self.db, Site).load_many(site_ids)
+        if None in sites:
+            raise HTTPException(status_code=404, detail=SITES_NOT_FOUND_ERROR)
+        return sites
+
+    async def commit(self) -> None:
+        """Commit the session, bumping the version of the touched entities.
+
+        The version bumps and the `group_stats` refresh go out as a single statement, and the
+        bumped versions are copied onto the entities of the session so nothing is re-read.
+        """
+        touched_sites, touched_groups, tables = self.db.info.pop("touched", ((), (), set()))
+        stats_sites, stats_groups = self.db.info.pop("stats", ([], set()))
+        created = [entity for entity in self.db.new if isinstance(entity, Site | Group)]
+        tables = {*tables, *(entity.__table__.name for entity in created)}
+        await self.db.flush()
+        # New sites only add their contribution, there is nothing to retract
+        created_sites = [entity.id for entity in created if isinstance(entity, Site)]
+        if created_sites:
+            stats_sites = [*stats_sites, created_sites]
+        stats = []
+        if stats_groups:
+            stats.append(self.group_stats_upsert(stats_groups))
+        if stats_sites:
+            # Recomputed rows already count the sites
+            stats.append(self.stats_delta(stats_sites, 1, stats_groups))
+        if touched_sites or touched_groups or tables or stats:
+            await self.bump_versions(touched_sites, touched_groups, tables, stats)
+        await self.db.commit()
+        self.db.info["committed"] = True
+        # Entities loaded before the write may have changed
+        self.db.info.pop("loaders", None)
+        site_cache.invalidate(touched_sites)
+        group_cache.invalidate(touched_groups)
+
+    async def bump_versions(
+        self,
+        site_ids: Iterable[int],
+        group_ids: Iterable[int],
+        tables: Iterable[str] = (),
+        stats: Iterable = (),
+    ) -> None:
+        """Bump the versions of the given entities and of the listings of their tables, or of
+        `tables`, running the `stats` upserts along."""
+        bumped = []
+        tables = set(tables)
+        for model, ids in ((Site, site_ids), (Group, group_ids)):
+            if ids:
+                table = model.__table__
+                tables.add(table.name)
+                bump = (
+                    update(table)
+                    .where(table.c.id.in_(list(ids)))
+                    .values(version=table.c.version + 1, updated_at=func.now())
+                    .returning(table.c.id, table.c.version, table.c.updated_at)
+                    .cte(f"bumped_{table.name}")
+                )
+                bumped.append(select(literal(table.name).label("table"), bump))
+        writes = []
+        if tables:
+            listings = insert(listing_versions).values(
+                [{"table_name": name, "version": 1} for name in sorted(tables)]
+            )
+            listings = listings.on_conflict_do_update(
+                index_elements=[listing_versions.c.table_name],
+                set_={"version": listing_versions.c.version + 1},
+            )
+            writes.append(listings.returning(listing_versions.c.table_name).cte("listings"))
+        writes.extend(
+            upsert.returning(group_stats.c.group_id).cte(f"group_stats_{index}")
+            for index, upsert in enumerate(stats)
+        )
+        if not bumped:
+            # Rows inserted only, their versions start at 1
+            await self.db.execute(select(writes[0]).add_cte(*writes[1:]))
+            return
+        # A select wrapping the union: compound selects leave their added CTEs out of the
+        # statement cache key, the stats CTE would run with the ids of an earlier call
+        stmt = select(union_all(*bumped).subquery("bumped")).add_cte(*writes)
+        models = {model.__tablename__: model for model in (Site, Group)}
+        for table, entity_id, version, updated_at in await self.db.execute(stmt):
+            entity = self.db.identity_map.get(identity_key(models[table], entity_id))
+            if entity is not None:
+                set_committed_value(entity, "version", version)
+                set_committed_value(entity, "updated_at", updated_at)
+
+    def stats_delta(self, sites: list, sign: int, excluded_group_ids: Iterable[int] = ()):
+        """Upsert adding (`sign` 1) or removing (-1) the contribution of `sites`, a list of
+        ids or queries of them, to the `group_stats` of every group they are in, directly or
+        below it, but `excluded_group_ids` and their ancestors.
+
+        Sums of floats drift slightly over many deltas, `rebuild_group_stats` recomputes
+        them exactly.
+        """
+        sites_table = Site.__table__
+        in_sites = or_(*(site_group_association.c.site_id.in_(source) for source in sites))
+        membership = group_membership().where(in_sites).subquery("membership")
+        totals = [
+            func.coalesce(func.sum(sites_table.c[name]), 0.0) * sign for name in STATS_COLUMNS
+        ]
+        stmt = (
+            select(membership.c.group_id, func.count() * sign, *totals)
+            .join_from(membership, sites_table, sites_table.c.id == membership.c.site_id)
+            .group_by(membership.c.group_id)
+        )
+        excluded_group_ids = list(excluded_group_ids)
+        if excluded_group_ids:
+            stmt = stmt.where(membership.c.group_id.not_in(ancestor_ids(excluded_group_ids)))
+        upsert = insert(group_stats).from_select([column.key for column in group_stats.c], stmt)
+        return upsert.on_conflict_do_update(
+            index_elements=[group_stats.c.group_id],
+            set_={
+                column.key: group_stats.c[column.key] + upsert.excluded[column.key]
+                for column in group_stats.c
+                if not column.primary_key
+            },
+        )
+
+    def group_stats_upsert(self, group_ids: Iterable[int] | None = None):
+        """Upsert of the `group_stats` rows of `group_ids` and their ancestors, of every group
+        when `None`.
+
+        A change below a group only affects the totals of its ancestors, so writes reshaping a
+        group recompute those rows from the closure table instead of the whole hierarchy.
+        Writes to a few sites or memberships use `stats_delta` instead, see `retract_stats`.
+        """
+        groups = Group.__table__
+        sites = Site.__table__
+        scope = None if group_ids is None else ancestor_ids(group_ids)
+        membership = group_membership(scope).subquery("membership")
+        totals = [func.coalesce(func.sum(sites.c[name]), 0.0) for name in STATS_COLUMNS]
+        stmt = (
+            select(groups.c.id, func.count(sites.c.id), *totals)
+            .select_from(groups)
+            .outerjoin(membership, membership.c.group_id == groups.c.id)
+            .outerjoin(sites, sites.c.id == membership.c.site_id)
+            .group_by(groups.c.id)
+        )
+        if scope is not None:
+            stmt = stmt.where(groups.c.id.in_(scope))
+        upsert = insert(group_stats).from_select([column.key for column in group_stats.c], stmt)
+        return upsert.on_conflict_do_update(
+            index_elements=[group_stats.c.group_id],
+            set_={
+                column.key: upsert.excluded[column.key]
+                for column in group_stats.c
+                if not column.primary_key
+            },
+        )
+
+    async def refresh_group_stats(self, group_ids: Iterable[int] | None = None) -> None:
+        """Recompute the `group_stats` rows of `group_ids` and their ancestors, of every group
+        when `None`."""
+        await self.db.execute(self.group_stats_upsert(group_ids))
+
+    async def trigram_enabled(self) -> bool:
+        """Whether the pg_trgm extension is installed, checked once per process."""
+        if "pg_trgm" not in self._extensions:
+            query = text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            self._extensions["pg_trgm"] = await self.db.scalar(query) is not None
+        return self._extensions["pg_trgm"]
+
+    async def list_version(self, filters: dict[str, Any] | None = None) -> tuple:
+        """Cheap fingerprint of a listing: the listing version of its table, bumped by every
+        write, and the table's highest id, both read from a primary key whatever the number of
+        matching rows. `filters` are only validated."""
+        self.filtered_query_builder(filters)
+        table = inspect(self.model_class).mapper.local_table
+        version = select(listing_versions.c.version).where(
+            listing_versions.c.table_name == table.name
+        )
+        stmt = select(version.scalar_subquery(), select(func.max(table.c.id)).scalar_subquery())
+        return tuple((await self.db.execute(stmt)).one())
+
+    async def count_with_filters(
+        self,
+        mode: CountMode,
+        filters: dict[str, Any] | None = None,
+        conditions: list | None = None,
+        search: str | None = None,
+    ) -> int | None:
+        """Total of the records matching a listing, `None` when not requested.
+
+        `estimated` reads the planner's row estimate, which scales `pg_class.reltuples` to the
+        current table size and applies column statistics to the filters, without scanning.
+        """
+        if mode == "none":
+            return None
+        builder = self.filtered_query_builder(filters)
+        builder.where(*conditions or [])
+        if search:
+            builder.search(search, await self.trigram_enabled())
+        if mode == "exact":
+            return await self.db.scalar(builder.build_aggregate(func.count()))
+        plan = await self.db.scalar(Explain(builder.build_aggregate(self.model_class.id)))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
     def query_builder(self) -> QueryBuilder:
         """Get a query builder that eagerly loads all relationships."""
         return QueryBuilder(self.model_class, self.relations)
 
-    async def list_with_filters(
-        self,
-        filters: dict[str, Any] | None = None,
-        sort: str | None = None,
-        output_schema: type[OutSchema] | None = None,
-    ) -> list[OutSchema]:
-        """List records with dynamic filtering and sorting"""
+    def filtered_query_builder(
+        self, filters: dict[str, Any] | None = None, sort: str | None = None
+    ) -> QueryBuilder:
+        """Get a query builder with the listing filters and sort applied."""
         builder = self.query_builder()
 
         # Apply filters
@@ -90,13 +686,109 @@ class BaseService(Generic[T, OutSchema]):
                 field = sort
                 order = "asc"
             builder.sort(field, order)
+        return builder
+
+    def filters_condition(self, filters: dict[str, Any] | None):
+        """Condition selecting the rows matched by listing `filters`, for bulk writes.
+
+        At least one filter is required, so a bulk write never reaches every row by mistake.
+        """
+        if not filters:
+            raise HTTPException(status_code=400, detail="At least one filter is required.")
+        return and_(*self.filtered_query_builder(filters).conditions)
+
+    async def list_with_filters(
+        self,
+        filters: dict[str, Any] | None = None,
+        sort: str | None = None,
+        output_schema: type[OutSchema] | None = None,
+        limit: int | None = None,
+        after: str | None = None,
+        conditions: list | None = None,
+    ) -> Page[OutSchema]:
+        """List records with dynamic filtering, sorting and keyset pagination"""
+        builder = self.filtered_query_builder(filters, sort)
+        builder.where(*conditions or [])
+        builder.paginate(limit, after)
 
         # Execute query
         stmt = builder.build()
         result = await self.db.execute(stmt)
-        records = result.scalars().all()
+        page = builder.page(result.scalars().all())
 
         # Convert to output schema if provided
         if output_schema:
-            return [output_schema.model_validate(record) for record in records]
-        return records
+            page.items = [output_schema.model_validate(record) for record in page.items]
+        return page
+
+    async def list_rows_with_filters(
+        self,
+        columns: list,
+        filters: dict[str, Any] | None = None,
+        sort: str | None = None,
+        limit: int | None = None,
+        after: str | None = None,
+        conditions: list | None = None,
+        search: str | None = None,
+    ) -> Page[dict[str, Any]]:
+        """List records as plain dicts of `columns`, without building ORM objects"""
+        builder = self.filtered_query_builder(filters, sort)
+        builder.where(*conditions or [])
+        if search:
+            builder.search(search, await self.trigram_enabled())
+        builder.paginate(limit, after)
+        builder.project(*columns)
+
+        result = await self.db.execute(builder.build())
+        page = builder.page(result.all())
+        page.items = [row._asdict() for row in page.items]
+        return page
+
+    async def related_summaries(
+        self, owner_column, related_column, related_model, owner_ids: Iterable[int]
+    ) -> dict[int, list[dict[str, Any]]]:
+        """Id and name of the records linked to each owner through an association table."""
+        summaries: dict[int, list[dict[str, Any]]] = {owner_id: [] for owner_id in owner_ids}
+        if not summaries:
+            return summaries
+        stmt = (
+            select(owner_column, related_model.id, related_model.name)
+            .select_from(owner_column.table)
+            .join(related_model, related_model.id == related_column)
+            # One array parameter, however many owners the page holds
+            .where(owner_column == any_(bindparam("owner_ids", list(summaries), ARRAY(Integer))))
+            .order_by(owner_column, related_model.id)
+        )
+        for owner_id, related_id, name in (await self.db.execute(stmt)).all():
+            summaries[owner_id].append({"id": related_id, "name": name})
+        return summaries
+
+    async def expand_rows(self, rows: list[dict[str, Any]], relations: Iterable[str]) -> None:
+        """Attach the summaries of each relationship in `relations` to the rows."""
+        ids = [row["id"] for row in rows]
+        for name in relations:
+            summaries = await self.related_summaries(*self.relation_summaries[name], ids)
+            for row in rows:
+                row[name] = summaries[row["id"]]
+
+    async def stream_statement(
+        self,
+        columns: list,
+        filters: dict[str, Any] | None = None,
+        sort: str | None = None,
+        search: str | None = None,
+    ):
+        """Query streaming records as `columns`, built up front so that invalid filters, sort
+        or search fail before a streaming response starts."""
+        builder = self.filtered_query_builder(filters, sort)
+        if search:
+            builder.search(search, await self.trigram_enabled())
+        return builder.project(*columns).build()
+
+    async def stream_rows(
+        self, stmt, batch_size: int = STREAM_BATCH_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Stream the rows of `stmt` as plain dicts in batches from a server-side cursor."""
+        result = await self.db.stream(stmt.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield [row._asdict() for row in rows]
@@ -0,0 +1,107 @@
+"""
+In-process read cache for single-entity lookups.
+
+The cache lives in the worker process: every worker keeps its own copy and invalidation
+only reaches the worker that handled the write, so the TTL bounds how stale another worker
+can be.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Generic, TypeVar
+
+from config import get_settings
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded least-recently-used cache whose entries expire after a TTL."""
+
+    def __init__(
+        self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # Generation at which each key was last invalidated, the oldest forgotten past
+        # `max_size` keys and `_floor` standing for them
+        self._generation = 0
+        self._invalidated: OrderedDict[K, int] = OrderedDict()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value, or None when missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key: K) -> V | None:
+        """Return the cached value without touching the counters or the LRU order."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[1]
+
+    def generation(self) -> int:
+        """Token to take before loading a value, for `set` to tell if it went stale since."""
+        return self._generation
+
+    def set(self, key: K, value: V, generation: int | None = None) -> None:
+        """Store a value, evicting the least recently used entries beyond `max_size`.
+
+        With the `generation` taken before the value was loaded, the value is dropped when the
+        key was invalidated since: a read racing a write must not cache what it replaced.
+        """
+        if self.max_size <= 0:
+            return
+        if generation is not None and generation < max(self._floor, self._invalidated.get(key, 0)):
+            return
+        self._entries[key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[K]) -> None:
+        """Drop the given keys, refusing values loaded before from `set`."""
+        for key in keys:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._invalidated[key] = self._generation
+            self._invalidated.move_to_end(key)
+        while len(self._invalidated) > max(self.max_size, 1):
+            _, self._floor = self._invalidated.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+        self._generation += 1
+        self._invalidated.clear()
+        self._floor = self._generation
+
+    def stats(self) -> dict[str, int]:
+        """Counters for monitoring."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+site_cache: LRUCache = LRUCache(get_settings().cache_max_size, get_settings().cache_ttl_seconds)
+group_cache: LRUCache = LRUCache(get_settings().cache_max_size, get_settings().cache_ttl_seconds)
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+
+import numpy as np
+from infrastructure.models import FrenchSite, ItalianSite
+
+# Column converting a megawatt of operating power into output, for each country model. Table
+# columns, as the mapped attributes would restrict a query to their subclass.
+COUNTRY_OUTPUT_FACTORS = {
+    model.__mapper__.polymorphic_identity: model.__mapper__.columns[name]
+    for model, name in ((FrenchSite, "useful_energy_at_1_megawatt"), (ItalianSite, "efficiency"))
+}
+
+
+@dataclass
+class CountryBatch:
+    """Parameters of the sites of one country, one array per column."""
+
+    country: str
+    min_power_megawatt: np.ndarray
+    max_power_megawatt: np.ndarray
+    output_factor: np.ndarray
+
+    @classmethod
+    def from_columns(cls, country: str, min_power, max_power, output_factor) -> "CountryBatch":
+        return cls(
+            country,
+            np.asarray(min_power, dtype=np.float64),
+            np.asarray(max_power, dtype=np.float64),
+            np.asarray(output_factor, dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.output_factor)
+
+
+def expected_energy(batch: CountryBatch, hours: float, load_factor: float) -> np.ndarray:
+    """Expected energy of every site of `batch` in MWh.
+
+    Sites are assumed to run at `load_factor` of the way between their minimum and maximum
+    power for `hours`, their country's output factor scaling the energy produced.
+    """
+    power = batch.min_power_megawatt + load_factor * (
+        batch.max_power_megawatt - batch.min_power_megawatt
+    )
+    return power * batch.output_factor * hours
+
+
+def summarize(batches: list[CountryBatch], hours: float, load_factor: float) -> dict:
+    """Total expected energy of the batches, overall and per country."""
+    countries = {}
+    for batch in batches:
+        energy = expected_energy(batch, hours, load_factor)
+        countries[batch.country] = {
+            "site_count": len(batch),
+            "expected_energy_megawatt_hour": float(energy.sum()),
+            "max_power_megawatt": float(batch.max_power_megawatt.sum()),
+        }
+    return {
+        "site_count": sum(country["site_count"] for country in countries.values()),
+        "expected_energy_megawatt_hour": sum(
+            country["expected_energy_megawatt_hour"] for country in countries.values()
+        ),
+        "countries": countries,
+    }
@@ -1,55 +1,100 @@
-from typing import List
+from collections.abc import AsyncIterator, Iterable
 
 from fastapi import HTTPException
-from infrastructure.models import Group, Site
-from schemas import GroupCreate, GroupOut, GroupUpdate
+from infrastructure.models import Group, GroupType, Site
+from infrastructure.models.site_group import (
+    group_closure,
+    group_group_association,
+    group_stats,
+    site_group_association,
+)
+from pydantic import TypeAdapter
+from schemas import (
+    BulkChangeResult,
+    GroupBulkUpdate,
+    GroupCreate,
+    GroupMemberCounts,
+    GroupMembershipResult,
+    GroupOut,
+    GroupRelative,
+    GroupStats,
+    GroupTreeNode,
+    GroupUpdate,
+)
+from sqlalchemy import Integer, any_, delete, exists, func, literal, not_, or_, update
+from sqlalchemy.dialects.postgresql import array, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.orm import selectinload
 
-from .base import BaseService
+from .base import (
+    GROUPS_NOT_FOUND_ERROR,
+    SITES_NOT_FOUND_ERROR,
+    BaseService,
+    Page,
+    parse_field_list,
+    schema_columns,
+    site_ids_below,
+)
+from .cache import group_cache
+
+DEFAULT_TREE_DEPTH = 10
+MAX_TREE_DEPTH = 100
+
+GROUP_ADAPTER: TypeAdapter[GroupOut] = TypeAdapter(GroupOut)
+GROUP_COLUMNS = schema_columns(Group.__table__, GroupOut)
+GROUP_RELATIONS = {
+    "child_groups": (
+        group_group_association.c.parent_group_id,
+        group_group_association.c.child_group_id,
+        Group,
+    ),
+    "sites": (site_group_association.c.group_id, site_group_association.c.site_id, Site),
+}
+GROUP_FIELDS = [column.key for column in GROUP_COLUMNS]
 
 
 class GroupService(BaseService[Group, GroupOut]):
     """Service for managing group-related operations."""
 
+    relation_summaries = GROUP_RELATIONS
+
     def __init__(self, db: AsyncSession):
         """Initialize the services with a DB session."""
         super().__init__(db, Group, ["child_groups", "sites"])
 
-    async def get_groups_by_ids(self, ids: list[int]) -> list[Group]:
-        stmt = select(Group).options(load_only(Group.id)).where(Group.id.in_(ids))
-        result = await self.db.execute(stmt)
-        groups = list(result.scalars().all())
-
-        if len(groups) != len(set(ids)):
-            raise HTTPException(status_code=404, detail="One or more groups not found.")
-
-        return groups
-
-    async def get_sites_by_ids(self, site_ids: List[int]) -> List[Site]:
-        q = await self.db.execute(select(Site).where(Site.id.in_(site_ids)))
-        sites = list(q.scalars().all())
-
-        if len(sites) != len(set(site_ids)):
-            raise HTTPException(status_code=404, detail="One or more sites not found.")
-
-        return sites
-
     async def create_group(self, group_data: GroupCreate) -> GroupOut:
         """Create a new group."""
         group = Group(**group_data.model_dump(exclude={"child_groups", "sites"}))
-        if group_data.child_groups:
-            group.child_groups = await self.get_groups_by_ids(group_data.child_groups)
-        if group_data.sites:
-            group.sites = await self.get_sites_by_ids(group_data.sites)
+        group.child_groups = await self.get_groups_by_ids(group_data.child_groups or [])
+        group.sites = await self.get_sites_by_ids(group_data.sites or [])
         self.db.add(group)
-        await self.db.commit()
-        await self.db.refresh(group, attribute_names=["child_groups", "sites"])
+        await self.db.flush()
+        if group_data.child_groups:
+            descendants = await self.closure_descendant_ids(group_data.child_groups)
+            await self.refresh_closure({group.id, *descendants})
+        else:
+            # Nothing is below a new group without children, and nothing above it yet
+            await self.db.execute(
+                insert(group_closure).values(ancestor_id=group.id, descendant_id=group.id, depth=0)
+            )
+        # The new group gets its stats row, sites embed a summary of their groups
+        self.mark_stats(group_ids=[group.id])
+        self.touch(site_ids=group_data.sites or [], group_ids=[group.id])
+        await self.commit()
         return GroupOut.model_validate(group)
 
     async def get_group(self, group_id: int) -> GroupOut:
-        """Retrieve a group by ID or raise 404 if not found."""
+        """Retrieve a group by ID or raise 404 if not found, from the read cache when possible."""
+        _, group = await self.get_versioned_group(group_id)
+        return group
+
+    async def get_versioned_group(self, group_id: int) -> tuple[int, GroupOut]:
+        """Retrieve a group and the version it was read at."""
+        cached = group_cache.get(group_id)
+        if cached is not None:
+            return cached
+        generation = group_cache.generation()
         stmt = (
             select(Group)
             .options(selectinload(Group.child_groups), selectinload(Group.sites))
@@ -60,51 +105,526 @@ class GroupService(BaseService[Group, GroupOut]):
 
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
-        return GroupOut.model_validate(group)
+        entry = (group.version, GroupOut.model_validate(group))
+        # A lagging replica could refill the cache with what a write just invalidated
+        if not self.db.info.get("replica"):
+            group_cache.set(group_id, entry, generation)
+        return entry
 
-    async def update_group(self, group_id: int, group_data: GroupUpdate) -> GroupOut:
-        """Update an existing group."""
-        stmt = (
-            select(Group)
-            .options(selectinload(Group.child_groups), selectinload(Group.sites))
+    async def get_group_member_counts(self, group_id: int) -> tuple[int, GroupMemberCounts]:
+        """Retrieve a group with the number of its direct members, and its version."""
+        site_count = (
+            select(func.count())
+            .where(site_group_association.c.group_id == Group.id)
+            .scalar_subquery()
+        )
+        child_group_count = (
+            select(func.count())
+            .where(group_group_association.c.parent_group_id == Group.id)
+            .scalar_subquery()
+        )
+        stmt = select(
+            Group.id,
+            Group.name,
+            Group.type,
+            Group.version,
+            site_count.label("site_count"),
+            child_group_count.label("child_group_count"),
+        ).where(Group.id == group_id)
+        row = (await self.db.execute(stmt)).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return row.version, GroupMemberCounts.model_validate(row)
+
+    async def get_group_version(self, group_id: int) -> int:
+        """Current version of a group, without loading it."""
+        cached = group_cache.peek(group_id)
+        if cached is not None:
+            return cached[0]
+        version = await self.db.scalar(select(Group.version).where(Group.id == group_id))
+        if version is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return version
+
+    async def parent_group_ids(self, group_ids: Iterable[int]) -> set[int]:
+        """Ids of the groups directly containing any of the given groups."""
+        group_ids = set(group_ids)
+        if not group_ids:
+            return set()
+        result = await self.db.execute(
+            select(group_group_association.c.parent_group_id).where(
+                group_group_association.c.child_group_id.in_(group_ids)
+            )
+        )
+        return set(result.scalars().all())
+
+    @staticmethod
+    def subtree_cte(group_id: int, max_depth: int):
+        """Recursive CTE walking `group_group_association` down from a group.
+
+        Yields one row per path (group_id, depth, path); a group already on the path is not
+        visited again, so cycles in the hierarchy cannot make the recursion diverge.
+        """
+        association = group_group_association
+        subtree = (
+            select(
+                Group.id.label("group_id"),
+                literal(0).label("depth"),
+                array([Group.id], type_=Integer).label("path"),
+            )
             .where(Group.id == group_id)
+            .cte("subtree", recursive=True)
         )
+        children = (
+            select(
+                association.c.child_group_id,
+                subtree.c.depth + 1,
+                func.array_append(subtree.c.path, association.c.child_group_id),
+            )
+            .join_from(subtree, association, association.c.parent_group_id == subtree.c.group_id)
+            .where(
+                subtree.c.depth < max_depth,
+                not_(association.c.child_group_id == any_(subtree.c.path)),
+            )
+        )
+        return subtree.union_all(children)
 
-        result = await self.db.execute(stmt)
+    async def get_group_descendants(
+        self, group_id: int, max_depth: int = DEFAULT_TREE_DEPTH
+    ) -> list[GroupRelative]:
+        """Every group below a group, each at its shortest depth, in one query."""
+        subtree = self.subtree_cte(group_id, max_depth)
+        stmt = (
+            select(Group.id, Group.name, Group.type, func.min(subtree.c.depth).label("depth"))
+            .join(subtree, subtree.c.group_id == Group.id)
+            .group_by(Group.id)
+            .order_by("depth", Group.id)
+        )
+        rows = (await self.db.execute(stmt)).all()
+        if not rows:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return [GroupRelative.model_validate(row, from_attributes=True) for row in rows[1:]]
+
+    async def get_group_tree(
+        self, group_id: int, max_depth: int = DEFAULT_TREE_DEPTH
+    ) -> GroupTreeNode:
+        """The nested hierarchy below a group, resolved in one query."""
+        subtree = self.subtree_cte(group_id, max_depth)
+        stmt = (
+            select(subtree.c.path, Group.id, Group.name, Group.type)
+            .join(subtree, subtree.c.group_id == Group.id)
+            .order_by(subtree.c.depth)
+        )
+        rows = (await self.db.execute(stmt)).all()
+        if not rows:
+            raise HTTPException(status_code=404, detail="Group not found")
+
+        # Rows come parent first, so each node's parent path is already indexed
+        nodes: dict[tuple[int, ...], dict] = {}
+        for path, node_id, name, group_type in rows:
+            node = {"id": node_id, "name": name, "type": group_type, "children": []}
+            path = tuple(path)
+            if len(path) > 1:
+                nodes[path[:-1]]["children"].append(node)
+            nodes[path] = node
+        return GroupTreeNode.model_validate(nodes[(group_id,)])
+
+    async def closure_descendant_ids(self, group_ids: Iterable[int]) -> set[int]:
+        """The given groups and every group below them, read from the closure table."""
+        group_ids = set(group_ids)
+        if not group_ids:
+            return set()
+        result = await self.db.execute(
+            select(group_closure.c.descendant_id).where(group_closure.c.ancestor_id.in_(group_ids))
+        )
+        return group_ids | set(result.scalars().all())
+
+    async def refresh_closure(self, group_ids: Iterable[int]) -> None:
+        """Recompute the closure rows of the given groups as descendants.
+
+        Callers pass every group whose set of ancestors may have changed; the rows are
+        rebuilt from `group_group_association` with an upward recursive CTE.
+        """
+        group_ids = set(group_ids)
+        if not group_ids:
+            return
+        association = group_group_association
+        await self.db.execute(
+            delete(group_closure).where(group_closure.c.descendant_id.in_(group_ids))
+        )
+        ancestors = (
+            select(
+                Group.id.label("descendant_id"),
+                Group.id.label("ancestor_id"),
+                literal(0).label("depth"),
+                array([Group.id], type_=Integer).label("path"),
+            )
+            .where(Group.id.in_(group_ids))
+            .cte("ancestors", recursive=True)
+        )
+        parents = (
+            select(
+                ancestors.c.descendant_id,
+                association.c.parent_group_id,
+                ancestors.c.depth + 1,
+                func.array_append(ancestors.c.path, association.c.parent_group_id),
+            )
+            .join_from(
+                ancestors, association, association.c.child_group_id == ancestors.c.ancestor_id
+            )
+            .where(not_(association.c.parent_group_id == any_(ancestors.c.path)))
+        )
+        ancestors = ancestors.union_all(parents)
+        await self.db.execute(
+            insert(group_closure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(
+                    ancestors.c.ancestor_id, ancestors.c.descendant_id, func.min(ancestors.c.depth)
+                ).group_by(ancestors.c.ancestor_id, ancestors.c.descendant_id),
+            )
+        )
+
+    async def get_group_stats(self, group_id: int) -> GroupStats:
+        """Read the maintained capacity totals of a group."""
+        row = (
+            await self.db.execute(select(group_stats).where(group_stats.c.group_id == group_id))
+        ).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return GroupStats.model_validate(row)
+
+    async def child_groups_condition(self, group_id: int):
+        """Condition selecting the direct child groups of a group, 404 when it does not exist."""
+        await self.get_group_type(group_id)
+        association = group_group_association
+        return Group.id.in_(
+            select(association.c.child_group_id).where(association.c.parent_group_id == group_id)
+        )
+
+    async def get_ancestor_groups_of_site(self, site_id: int) -> list[GroupRelative]:
+        """Every group containing a site directly or through child groups, in one join."""
+        stmt = (
+            select(Group.id, Group.name, Group.type, func.min(group_closure.c.depth).label("depth"))
+            .join(group_closure, group_closure.c.ancestor_id == Group.id)
+            .join(
+                site_group_association,
+                site_group_association.c.group_id == group_closure.c.descendant_id,
+            )
+            .where(site_group_association.c.site_id == site_id)
+            .group_by(Group.id)
+            .order_by("depth", Group.id)
+        )
+        rows = (await self.db.execute(stmt)).all()
+        if not rows and await self.db.scalar(select(Site.id).where(Site.id == site_id)) is None:
+            raise HTTPException(status_code=404, detail="Site not found")
+        return [GroupRelative.model_validate(row, from_attributes=True) for row in rows]
+
+    async def update_group(self, group_id: int, group_data: GroupUpdate) -> GroupOut:
+        """Update an existing group."""
+        update_data = group_data.model_dump(exclude_unset=True, exclude={"child_groups", "sites"})
+        stmt = select(Group).where(Group.id == group_id)
+        if update_data:
+            # The updated row comes back with the UPDATE itself
+            groups = Group.__table__
+            stmt = select(Group).from_statement(
+                update(groups)
+                .where(groups.c.id == group_id)
+                .values(update_data)
+                .returning(*groups.c)
+            )
+        result = await self.db.execute(
+            stmt.options(selectinload(Group.child_groups), selectinload(Group.sites))
+        )
         group = result.scalar_one_or_none()
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
-        for field, value in group_data.model_dump(
-            exclude_unset=True, exclude={"child_groups", "sites"}
-        ).items():
-            setattr(group, field, value)
+        # Parents embed a summary of this group and sites a summary of their groups
+        affected_groups = {group_id}
+        affected_sites = set()
+        if "name" in update_data:
+            affected_groups |= await self.parent_group_ids([group_id])
+            affected_sites |= {site.id for site in group.sites}
         if group_data.child_groups:
+            # Every group reachable from this one, before or after the change, may see its
+            # set of ancestors change
+            affected = await self.closure_descendant_ids([group_id])
             groups = await self.get_groups_by_ids(group_data.child_groups)
             group.child_groups = groups
+            await self.db.flush()
+            affected |= await self.closure_descendant_ids(group_data.child_groups)
+            await self.refresh_closure(affected)
         if group_data.sites:
+            affected_sites |= {site.id for site in group.sites}
+            affected_sites.update(group_data.sites)
             sites = await self.get_sites_by_ids(group_data.sites)
             group.sites = sites
-        await self.db.commit()
-        await self.db.refresh(group, attribute_names=["child_groups", "sites"])
+        if group_data.child_groups or group_data.sites:
+            self.mark_stats(group_ids=[group_id])
+        self.touch(site_ids=affected_sites, group_ids=affected_groups)
+        await self.commit()
         return GroupOut.model_validate(group)
 
-    async def delete_group(self, group_id: int):
-        """Delete a group if it has no sites or subgroups."""
-        group = await self.db.get(Group, group_id)
-        if not group:
+    async def get_group_type(self, group_id: int) -> GroupType:
+        """Type of a group, 404 when it does not exist."""
+        group_type = await self.db.scalar(select(Group.type).where(Group.id == group_id))
+        if group_type is None:
             raise HTTPException(status_code=404, detail="Group not found")
+        return group_type
 
-        # Check if the group contains sites
-        has_sites = await self.db.scalar(select(Group.sites.any()).where(Group.id == group_id))
-        if has_sites:
-            raise HTTPException(status_code=400, detail="Cannot delete group linked to sites.")
+    async def add_members(
+        self, group_id: int, relation: str, member_ids: Iterable[int]
+    ) -> GroupMembershipResult:
+        """Add sites or child groups to a group, as named by `relation`.
+
+        A single INSERT ... ON CONFLICT DO NOTHING over the given ids: the cost follows the
+        number of ids, not the size of the group.
+        """
+        owner, member, model = GROUP_RELATIONS[relation]
+        if await self.get_group_type(group_id) == GroupType.group3 and model is Site:
+            raise HTTPException(400, f"Group {group_id} is of type group3 — not allowed.")
+        member_ids = set(member_ids)
+        members = model.__table__
+        found = select(members.c.id).where(members.c.id.in_(member_ids)).cte("found")
+        added = (
+            insert(owner.table)
+            .from_select([owner.key, member.key], select(literal(group_id, Integer), found.c.id))
+            .on_conflict_do_nothing()
+            .returning(member)
+            .cte("added")
+        )
+        stmt = select(
+            select(func.count()).select_from(found).scalar_subquery(),
+            select(func.array_agg(added.c[member.key])).scalar_subquery(),
+        )
+        stmt = self.retract_stats(self.member_sites(relation, member_ids), stmt)
+        found_count, added_ids = (await self.db.execute(stmt)).one()
+        if found_count < len(member_ids):
+            await self.db.rollback()
+            missing = SITES_NOT_FOUND_ERROR if model is Site else GROUPS_NOT_FOUND_ERROR
+            raise HTTPException(status_code=404, detail=missing)
+        return await self.membership_changed(group_id, relation, member_ids, added_ids or [])
+
+    async def remove_members(
+        self, group_id: int, relation: str, member_ids: Iterable[int]
+    ) -> GroupMembershipResult:
+        """Remove sites or child groups from a group with a single DELETE, ids that are not
+        members are ignored."""
+        owner, member, _ = GROUP_RELATIONS[relation]
+        await self.get_group_type(group_id)
+        member_ids = set(member_ids)
+        stmt = (
+            delete(owner.table).where(owner == group_id, member.in_(member_ids)).returning(member)
+        )
+        stmt = self.retract_stats(self.member_sites(relation, member_ids), stmt)
+        result = await self.db.execute(stmt)
+        return await self.membership_changed(group_id, relation, member_ids, result.scalars().all())
+
+    @staticmethod
+    def member_sites(relation: str, member_ids: Iterable[int]):
+        """The sites whose groups change when `member_ids` join or leave a group: the sites
+        themselves, or the sites below the child groups."""
+        return list(member_ids) if relation == "sites" else site_ids_below(member_ids)
 
-        await self.db.delete(group)
-        await self.db.commit()
+    async def membership_changed(
+        self, group_id: int, relation: str, requested_ids: set[int], member_ids: list[int]
+    ) -> GroupMembershipResult:
+        """Propagate a membership change and commit it.
+
+        The stats of the sites of `requested_ids` were retracted by the change, their
+        contribution is added back whether or not they changed.
+        """
+        self.mark_stats(self.member_sites(relation, requested_ids))
+        if member_ids and relation == "child_groups":
+            # The moved groups and everything below them gained or lost ancestors
+            await self.refresh_closure(await self.closure_descendant_ids(member_ids))
+        # The group embeds a summary of its members, sites one of their groups
+        self.touch(
+            site_ids=member_ids if relation == "sites" else (),
+            group_ids=[group_id] if member_ids else (),
+        )
+        await self.commit()
+        return GroupMembershipResult(group_id=group_id, changed=sorted(member_ids))
+
+    async def update_groups(
+        self, filters: dict, group_data: GroupBulkUpdate, dry_run: bool = False
+    ) -> BulkChangeResult:
+        """Update every group matching `filters` with a single UPDATE, refusing to turn groups
+        containing sites into group3 groups."""
+        groups = Group.__table__
+        condition = self.filters_condition(filters)
+        if dry_run:
+            count = await self.db.scalar(select(func.count()).where(condition))
+            return BulkChangeResult(affected=count, dry_run=True)
+        update_data = group_data.model_dump(exclude_unset=True)
+        result = await self.db.execute(
+            update(groups).where(condition).values(update_data).returning(groups.c.id)
+        )
+        group_ids = result.scalars().all()
+        members = site_group_association
+        in_groups = members.c.group_id.in_(group_ids)
+        if update_data.get("type") == GroupType.group3:
+            linked = await self.db.scalar(select(members.c.group_id).where(in_groups).limit(1))
+            if linked is not None:
+                await self.db.rollback()
+                raise HTTPException(400, f"Group {linked} is of type group3 — not allowed.")
+        # Parents embed a summary of their children, sites a summary of their groups
+        affected_groups = set(group_ids)
+        affected_sites = set()
+        if "name" in update_data and group_ids:
+            affected_groups |= await self.parent_group_ids(group_ids)
+            result = await self.db.execute(select(members.c.site_id).where(in_groups))
+            affected_sites |= set(result.scalars().all())
+        self.touch(site_ids=affected_sites, group_ids=affected_groups)
+        await self.commit()
+        return BulkChangeResult(affected=len(group_ids), dry_run=False)
+
+    @staticmethod
+    def doomed_groups(condition):
+        """The groups matching `condition` and every group below them, none as soon as one of
+        the matching groups has sites."""
+        groups = Group.__table__
+        roots = select(groups.c.id).where(condition)
+        return select(groups.c.id).where(
+            or_(
+                groups.c.id.in_(roots),
+                groups.c.id.in_(
+                    select(group_closure.c.descendant_id).where(
+                        group_closure.c.ancestor_id.in_(roots)
+                    )
+                ),
+            ),
+            ~exists().where(site_group_association.c.group_id.in_(roots)),
+        )
+
+    async def delete_groups_where(self, condition) -> list[int]:
+        """Delete the groups of `doomed_groups` and return their ids.
+
+        The check, the deletes and the lookup of what they affect form a single statement;
+        closure and stats rows of the deleted groups go away with them (ON DELETE CASCADE).
+        """
+        groups = Group.__table__
+        links = group_group_association
+        members = site_group_association
+        doomed = self.doomed_groups(condition).cte("doomed")
+        unlinked = (
+            delete(links)
+            .where(
+                or_(
+                    links.c.parent_group_id.in_(select(doomed.c.id)),
+                    links.c.child_group_id.in_(select(doomed.c.id)),
+                )
+            )
+            .returning(links.c.parent_group_id)
+            .cte("unlinked")
+        )
+        removed = (
+            delete(members)
+            .where(members.c.group_id.in_(select(doomed.c.id)))
+            .returning(members.c.site_id)
+            .cte("removed")
+        )
+        deleted = (
+            delete(groups)
+            .where(groups.c.id.in_(select(doomed.c.id)))
+            .returning(groups.c.id)
+            .cte("deleted")
+        )
+        stmt = select(
+            *(
+                select(func.array_agg(column)).scalar_subquery()
+                for column in (deleted.c.id, unlinked.c.parent_group_id, removed.c.site_id)
+            )
+        )
+        deleted_ids, parent_ids, site_ids = (await self.db.execute(stmt)).one()
+        deleted_ids = deleted_ids or []
+        # Parents lose the sites below the deleted groups
+        self.mark_stats(group_ids=parent_ids or [])
+        # Parents embed a summary of their children, sites a summary of their groups
+        self.touch(site_ids=site_ids or [], group_ids=deleted_ids + (parent_ids or []))
+        return deleted_ids
+
+    async def delete_group(self, group_id: int):
+        """Delete a group and every group below it, unless it has sites."""
+        if not await self.delete_groups_where(Group.__table__.c.id == group_id):
+            if await self.db.scalar(select(Group.id).where(Group.id == group_id)) is None:
+                raise HTTPException(status_code=404, detail="Group not found")
+            raise HTTPException(status_code=400, detail="Cannot delete group linked to sites.")
+        await self.commit()
         return {"ok": True}
 
+    async def delete_groups(self, filters: dict, dry_run: bool = False) -> BulkChangeResult:
+        """Delete every group matching `filters` and the groups below them, unless one of the
+        matching groups has sites."""
+        condition = self.filters_condition(filters)
+        roots = select(Group.__table__.c.id).where(condition)
+        linked = exists().where(site_group_association.c.group_id.in_(roots))
+        if await self.db.scalar(select(linked)):
+            raise HTTPException(status_code=400, detail="Cannot delete groups linked to sites.")
+        if dry_run:
+            doomed = self.doomed_groups(condition).subquery()
+            count = await self.db.scalar(select(func.count()).select_from(doomed))
+            return BulkChangeResult(affected=count, dry_run=True)
+        deleted = await self.delete_groups_where(condition)
+        await self.commit()
+        return BulkChangeResult(affected=len(deleted), dry_run=False)
+
     async def list_groups(
-        self, filters: dict | None = None, sort: str | None = None
-    ) -> list[GroupOut]:
-        """List all groups with optional filtering and sorting."""
-        return await self.list_with_filters(filters, sort, GroupOut)
+        self,
+        filters: dict | None = None,
+        sort: str | None = None,
+        limit: int | None = None,
+        after: str | None = None,
+        fields: list[str] | None = None,
+        expand: list[str] | None = None,
+        search: str | None = None,
+        conditions: list | None = None,
+    ) -> Page[GroupOut | dict]:
+        """List groups with optional filtering, name search, sorting, keyset pagination and sparse
+        fieldsets."""
+        page = await self.list_rows_with_filters(
+            self.group_columns(fields),
+            filters,
+            sort,
+            limit=limit,
+            after=after,
+            conditions=conditions,
+            search=search,
+        )
+        page.items = await self.present_groups(page.items, fields, expand)
+        return page
+
+    @staticmethod
+    def sparse_fieldset(
+        fields: str | None, expand: str | None
+    ) -> tuple[list[str] | None, list[str] | None]:
+        """Parse the `fields` and `expand` query parameters, rejecting unknown names."""
+        return (
+            parse_field_list(fields, GROUP_FIELDS, "fields"),
+            parse_field_list(expand, GROUP_RELATIONS, "expand"),
+        )
+
+    @staticmethod
+    def group_columns(fields: list[str] | None) -> list:
+        """Columns to project for the requested fields, all of them by default."""
+        if fields is None:
+            return GROUP_COLUMNS
+        return [column for column in GROUP_COLUMNS if column.key in fields]
+
+    async def present_groups(
+        self, rows: list[dict], fields: list[str] | None, expand: list[str] | None
+    ) -> list[GroupOut | dict]:
+        """Turn listing rows into validated groups, or into the requested sparse fieldset."""
+        if fields is None and expand is None:
+            await self.expand_rows(rows, GROUP_RELATIONS)
+            return [GROUP_ADAPTER.validate_python(row) for row in rows]
+        expand = expand or []
+        await self.expand_rows(rows, expand)
+        keys = [*(fields or GROUP_FIELDS), *expand]
+        return [{key: row[key] for key in keys} for row in rows]
+
+    async def stream_groups(
+        self, stmt, fields: list[str] | None = None, expand: list[str] | None = None
+    ) -> AsyncIterator[list[GroupOut | dict]]:
+        """Stream the groups of a `stream_statement` query in serialized batches."""
+        async for rows in self.stream_rows(stmt):
+            yield await self.present_groups(rows, fields, expand)
@@ -0,0 +1,92 @@
+"""
+In-process registry of background jobs and the process pool running CPU bound work.
+
+Like the read cache, jobs live in the worker process that accepted them: they are lost on
+restart and polling must reach the same worker.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Literal
+
+from config import get_settings
+
+JobStatus = Literal["pending", "running", "done", "failed"]
+
+
+@dataclass
+class Job:
+    id: str
+    status: JobStatus = "pending"
+    result: Any = None
+    error: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+
+class JobRegistry:
+    """Runs coroutines in the background and keeps the latest `max_size` jobs for polling."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+
+    def submit(self, run: Callable[[], Awaitable[Any]]) -> Job:
+        job = Job(id=uuid.uuid4().hex)
+        job.task = asyncio.create_task(self._run(job, run))
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_size:
+            oldest = next(iter(self._jobs.values()))
+            if oldest.task is not None and not oldest.task.done():
+                break
+            self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    @staticmethod
+    async def _run(job: Job, run: Callable[[], Awaitable[Any]]) -> None:
+        job.status = "running"
+        try:
+            job.result = await run()
+        except Exception as exc:
+            job.status, job.error = "failed", f"{type(exc).__name__}: {exc}"
+        else:
+            job.status = "done"
+
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def process_pool_size() -> int:
+    """Number of worker processes of the pool."""
+    return get_settings().simulation_workers or os.cpu_count() or 1
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """Pool shared by CPU bound jobs, started on first use."""
+    global _process_pool
+    if _process_pool is None:
+        # Fresh interpreters rather than forks of a process running an event loop and threads
+        _process_pool = ProcessPoolExecutor(
+            process_pool_size(), mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+simulation_jobs = JobRegistry(get_settings().job_history_size)
@@ -0,0 +1,60 @@
+"""
+Batched, memoized loads of entities by id, scoped to a database session.
+
+Every service working on a session shares its loaders, so within one request an entity is
+fetched at most once, and ids requested concurrently are fetched by a single `IN (...)` query.
+"""
+
+import asyncio
+from collections.abc import Iterable
+from typing import Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+T = TypeVar("T")
+
+
+class EntityLoader(Generic[T]):
+    """Loads entities of `model` by id, at most once each and in batches."""
+
+    def __init__(self, db: AsyncSession, model: type[T]):
+        self.db = db
+        self.model = model
+        self._results: dict[int, asyncio.Future] = {}
+        self._queued: list[int] = []
+        self._dispatch: asyncio.Task | None = None
+
+    async def load_many(self, ids: Iterable[int]) -> list[T | None]:
+        """Entities of `ids` in order, `None` for the missing ones."""
+        ids = list(dict.fromkeys(ids))
+        loop = asyncio.get_running_loop()
+        for entity_id in ids:
+            if entity_id not in self._results:
+                self._results[entity_id] = loop.create_future()
+                self._queued.append(entity_id)
+        if self._queued and self._dispatch is None:
+            self._dispatch = loop.create_task(self._fetch_queued())
+        return [await self._results[entity_id] for entity_id in ids]
+
+    async def _fetch_queued(self) -> None:
+        # Yield once so lookups started concurrently queue their ids into the same query
+        await asyncio.sleep(0)
+        ids, self._queued, self._dispatch = self._queued, [], None
+        try:
+            result = await self.db.execute(select(self.model).where(self.model.id.in_(ids)))
+            found = {entity.id: entity for entity in result.scalars()}
+        except Exception as exc:
+            for entity_id in ids:
+                self._results.pop(entity_id).set_exception(exc)
+            return
+        for entity_id in ids:
+            self._results[entity_id].set_result(found.get(entity_id))
+
+
+def session_loader(db: AsyncSession, model: type[T]) -> EntityLoader[T]:
+    """The loader of `model` shared by everything using the session."""
+    loaders = db.info.setdefault("loaders", {})
+    if model not in loaders:
+        loaders[model] = EntityLoader(db, model)
+    return loaders[model]
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+DAYS_PER_YEAR = 365.25
+HOURS_PER_DAY = 24
+
+
+@dataclass
+class SimulationChunk:
+    """Parameters of a contiguous id range of sites, one array per column.
+
+    `country_index` points into the scenario countries and each (`member_site`, `member_group`)
+    pair puts a site, by position in the chunk, in a group, by position in the scenario groups.
+    """
+
+    min_power_megawatt: np.ndarray
+    max_power_megawatt: np.ndarray
+    output_factor: np.ndarray
+    installation_day: np.ndarray
+    country_index: np.ndarray
+    member_site: np.ndarray
+    member_group: np.ndarray
+
+    @classmethod
+    def from_columns(
+        cls,
+        countries: list[str],
+        groups: np.ndarray,
+        ids,
+        min_power,
+        max_power,
+        output_factor,
+        installation_date,
+        country,
+        member_ids,
+        member_group_ids,
+    ) -> "SimulationChunk":
+        """Chunk of the sites of `ids`, in order, from their columns and memberships.
+
+        Memberships of sites outside `ids` or of groups outside the sorted scenario `groups`
+        are left out.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        member_ids = np.asarray(member_ids, dtype=np.int64)
+        member_group_ids = np.asarray(member_group_ids, dtype=np.int64)
+        kept = np.isin(member_ids, ids) & np.isin(member_group_ids, groups)
+        return cls(
+            np.asarray(min_power, dtype=np.float64),
+            np.asarray(max_power, dtype=np.float64),
+            np.asarray(output_factor, dtype=np.float64),
+            np.asarray(installation_date, dtype="datetime64[D]").astype(np.int64),
+            np.searchsorted(countries, np.asarray(country, dtype=str)),
+            np.searchsorted(ids, member_ids[kept]),
+            np.searchsorted(groups, member_group_ids[kept]),
+        )
+
+
+@dataclass
+class Scenario:
+    first_day: int
+    days: int
+    curtailment: float
+    degradation_per_year: float
+    country_count: int
+    group_count: int
+
+
+def site_curves(chunk: SimulationChunk, scenario: Scenario) -> np.ndarray:
+    """Daily energy of every site of `chunk` in MWh, one row per site.
+
+    Curtailment moves the operating power from the maximum (0) to the minimum (1) power, and
+    output decays by `degradation_per_year` compounded since installation. Nothing is produced
+    before the installation day.
+    """
+    power = chunk.max_power_megawatt - scenario.curtailment * (
+        chunk.max_power_megawatt - chunk.min_power_megawatt
+    )
+    daily = power * chunk.output_factor * HOURS_PER_DAY
+    days = np.arange(scenario.first_day, scenario.first_day + scenario.days)
+    age = days[np.newaxis, :] - chunk.installation_day[:, np.newaxis]
+    if not age.size:
+        return np.zeros(age.shape)
+    # Ages are whole days: look the decay up instead of raising to a power per site and day
+    youngest = int(age.min())
+    ages = np.arange(youngest, int(age.max()) + 1)
+    decay = np.where(
+        ages >= 0, (1 - scenario.degradation_per_year) ** (np.maximum(ages, 0) / DAYS_PER_YEAR), 0.0
+    )
+    return daily[:, np.newaxis] * decay[age - youngest]
+
+
+def simulate_chunk(chunk: SimulationChunk, scenario: Scenario) -> tuple[np.ndarray, np.ndarray]:
+    """Daily energy of the chunk summed per country and per group.
+
+    Curves are added to the rows of their country and of each of their groups in place,
+    memory following the number of sites and memberships rather than sites times groups.
+    """
+    curves = site_curves(chunk, scenario)
+    countries = np.zeros((scenario.country_count, scenario.days))
+    np.add.at(countries, chunk.country_index, curves)
+    groups = np.zeros((scenario.group_count, scenario.days))
+    np.add.at(groups, chunk.member_group, curves[chunk.member_site])
+    return countries, groups
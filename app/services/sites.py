@@ -1,25 +1,123 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import date
-from typing import List
 
+import numpy as np
+from config import get_settings
 from fastapi import HTTPException
 from infrastructure.models import FrenchSite, Group, GroupType, ItalianSite, Site
-from pydantic import BaseModel
-from schemas import SiteCreate, SiteOut, SiteUpdate
+from infrastructure.models.site_group import (
+    FRENCH_INSTALLATION_DATE_INDEX,
+    group_closure,
+    site_group_association,
+)
+from pydantic import BaseModel, TypeAdapter
+from schemas import (
+    BulkChangeResult,
+    SimulationRequest,
+    SiteBulkResult,
+    SiteBulkUpdate,
+    SiteCreate,
+    SiteEstimate,
+    SiteEstimateRequest,
+    SiteOut,
+    SiteScope,
+    SiteStats,
+    SiteUpdate,
+)
 from schemas.site import FrenchSiteOut, ItalianSiteOut
+from sqlalchemy import case, delete, exists, func, insert, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, with_polymorphic
 
-from .base import BaseService
+from .base import (
+    GROUPS_NOT_FOUND_ERROR,
+    STATS_COLUMNS,
+    BaseService,
+    Page,
+    QueryBuilder,
+    group_membership,
+    parse_field_list,
+    schema_columns,
+)
+from .cache import site_cache
+from .estimation import COUNTRY_OUTPUT_FACTORS, CountryBatch, summarize
+from .jobs import process_pool, process_pool_size
+from .simulation import Scenario, SimulationChunk, simulate_chunk
 
 # A mapping between country → model class
 COUNTRY_MODEL_MAP = {"fr": FrenchSite, "it": ItalianSite}
 SITE_SCHEME_OUT: dict[str, type[BaseModel]] = {"fr": FrenchSiteOut, "it": ItalianSiteOut}
+# Built once: validating listing rows reuses the compiled validators
+SITE_ADAPTERS: dict[str, TypeAdapter] = {
+    country: TypeAdapter(schema) for country, schema in SITE_SCHEME_OUT.items()
+}
+SITE_STATS_ADAPTER: TypeAdapter[list[SiteStats]] = TypeAdapter(list[SiteStats])
+SITE_COLUMNS = schema_columns(Site.__table__, *SITE_SCHEME_OUT.values())
+SITE_RELATIONS = {
+    "groups": (site_group_association.c.site_id, site_group_association.c.group_id, Group)
+}
+# Fields selectable with `?fields=`, and those returned by default for each country
+SITE_FIELDS = [column.key for column in SITE_COLUMNS]
+SITE_COUNTRY_FIELDS = {
+    country: [name for name in schema.model_fields if name not in SITE_RELATIONS]
+    for country, schema in SITE_SCHEME_OUT.items()
+}
+
+# Keys `site_stats` can group by, and the aggregates computed for each measured column
+STATS_DIMENSIONS = ("country", "month", "group")
+STATS_MEASURES = {
+    "max_power_megawatt": ("sum", "min", "max"),
+    "min_power_megawatt": ("sum", "min", "max"),
+    "useful_energy_at_1_megawatt": ("sum", "min", "max"),
+    "efficiency": ("avg", "min", "max"),
+}
+# Output factor of each site, from its country's column
+SITE_OUTPUT_FACTOR = case(
+    *(
+        (Site.__table__.c.country == country, column)
+        for country, column in COUNTRY_OUTPUT_FACTORS.items()
+    )
+)
+
+# Columns only the sites of one country have, by name
+COUNTRY_COLUMNS = {
+    key: country
+    for country, model in COUNTRY_MODEL_MAP.items()
+    for key in model.__mapper__.columns.keys()
+    if key not in Site.__mapper__.columns.keys()
+}
+
+MAX_BULK_SIZE = 10000
+
+FRENCH_SITE_PER_DAY_ERROR = "Only one French site can be installed per day."
+ITALIAN_SITE_WEEKEND_ERROR = "Italian sites must be installed on weekends."
+
+
+def site_update_values(update_data: dict) -> dict:
+    """Values of a site UPDATE, country specific columns only written on that country's sites."""
+    sites = Site.__table__
+    country = update_data.get("country")
+    values = {}
+    for key, value in update_data.items():
+        owner = COUNTRY_COLUMNS.get(key)
+        if owner is None or owner == country:
+            values[key] = value
+        elif country is None:
+            values[key] = case((sites.c.country == owner, value), else_=sites.c[key])
+    return values
 
 
 class SiteService(BaseService[Site, FrenchSite | ItalianSite]):
     """Service for managing site-related operations."""
 
+    relation_summaries = SITE_RELATIONS
+
     def __init__(self, db: AsyncSession):
         """Initialize the services with a DB session."""
         site_entity = with_polymorphic(Site, [FrenchSite, ItalianSite])
@@ -33,54 +131,176 @@ class SiteService(BaseService[Site, FrenchSite | ItalianSite]):
                 raise HTTPException(400, f"Group {group.id} is of type group3 — not allowed.")
         return groups
 
-    async def get_groups_by_ids(self, group_ids: List[int]) -> List[Group]:
-        stmt = select(Group).where(Group.id.in_(group_ids))
-        result = await self.db.execute(stmt)
-        groups = list(result.scalars().all())
-        if len(groups) != len(set(group_ids)):
-            raise HTTPException(status_code=404, detail="One or more groups not found.")
-        return groups
+    @staticmethod
+    def validate_installation_constraints(installation_date: date, country: str) -> None:
+        """Apply business rules for Italian site installation dates.
 
-    async def validate_installation_constraints(
-        self, installation_date: date, country: str, side_id=None
-    ) -> None:
-        """Apply business rules for French and Italian site installation dates."""
-        if country == "fr":
-            q = await self.db.execute(
-                select(Site).where(
-                    Site.country == "fr", Site.installation_date == installation_date
-                )
-            )
-            result = q.scalars().first()
-            if result and side_id != result.id:
-                raise HTTPException(
-                    status_code=400, detail="Only one French site can be installed per day."
-                )
+        The one French site per day rule is enforced by a partial unique index, see
+        `commit`.
+        """
         if country == "it":
             weekday = installation_date.weekday()
             if weekday not in (5, 6):
-                raise HTTPException(
-                    status_code=400, detail="Italian sites must be installed on weekends."
-                )
+                raise HTTPException(status_code=400, detail=ITALIAN_SITE_WEEKEND_ERROR)
+
+    @asynccontextmanager
+    async def installation_date_guard(self) -> AsyncIterator[None]:
+        """Report a write hitting the one French site per day index as a 400."""
+        try:
+            yield
+        except IntegrityError as exc:
+            await self.db.rollback()
+            if FRENCH_INSTALLATION_DATE_INDEX in str(exc.orig):
+                raise HTTPException(status_code=400, detail=FRENCH_SITE_PER_DAY_ERROR) from exc
+            raise
+
+    async def commit(self) -> None:
+        """Commit the session, translating installation date conflicts."""
+        async with self.installation_date_guard():
+            await super().commit()
 
     async def create_site(self, site_data: SiteCreate) -> SiteOut:
         """Create a new site with validation logic applied."""
-        await self.validate_installation_constraints(site_data.installation_date, site_data.country)
+        self.validate_installation_constraints(site_data.installation_date, site_data.country)
         await self.validate_group_ids_not_group3(site_data.groups or [])
         model_cls = COUNTRY_MODEL_MAP.get(site_data.country)
         if not model_cls:
             raise HTTPException(400, detail=f"Unsupported country: {site_data.country}")
         site = model_cls(**site_data.model_dump(exclude_unset=True, exclude={"groups"}))
-        if site_data.groups:
-            site.groups = await self.get_groups_by_ids(site_data.groups)
+        # Already loaded by the group3 check, the session's loader does not query them again
+        site.groups = await self.get_groups_by_ids(site_data.groups or [])
         self.db.add(site)
-        await self.db.commit()
-        await self.db.refresh(site, attribute_names=["groups"])
+        # Groups embed a summary of their sites
+        self.touch(group_ids=site_data.groups or [])
+        await self.commit()
         schema = SITE_SCHEME_OUT[site.country]
         return schema.model_validate(site)
 
+    async def bulk_create_sites(self, sites_data: list[SiteCreate]) -> list[SiteBulkResult]:
+        """Create many sites at once, validating the business rules set-based.
+
+        Invalid items are reported individually; valid ones are inserted with multi-row
+        INSERTs in a single transaction.
+        """
+        errors: dict[int, str] = {}
+        for index, site_data in enumerate(sites_data):
+            if site_data.country not in COUNTRY_MODEL_MAP:
+                errors[index] = f"Unsupported country: {site_data.country}"
+            elif site_data.country == "it" and site_data.installation_date.weekday() not in (5, 6):
+                errors[index] = ITALIAN_SITE_WEEKEND_ERROR
+
+        # One query for every referenced group and its type
+        group_ids = {group_id for site_data in sites_data for group_id in site_data.groups or []}
+        group_types = {}
+        if group_ids:
+            result = await self.db.execute(
+                select(Group.id, Group.type).where(Group.id.in_(group_ids))
+            )
+            group_types = dict(result.all())
+        for index, site_data in enumerate(sites_data):
+            if index in errors:
+                continue
+            for group_id in site_data.groups or []:
+                if group_id not in group_types:
+                    errors[index] = GROUPS_NOT_FOUND_ERROR
+                    break
+                if group_types[group_id] == GroupType.group3:
+                    errors[index] = f"Group {group_id} is of type group3 — not allowed."
+                    break
+
+        # One query for the French installation dates already taken, collisions inside the
+        # batch are resolved in order of appearance
+        french_dates = {
+            site_data.installation_date
+            for index, site_data in enumerate(sites_data)
+            if site_data.country == "fr" and index not in errors
+        }
+        taken_dates = set()
+        if french_dates:
+            result = await self.db.execute(
+                select(Site.installation_date).where(
+                    Site.country == "fr", Site.installation_date.in_(french_dates)
+                )
+            )
+            taken_dates = set(result.scalars().all())
+        for index, site_data in enumerate(sites_data):
+            if site_data.country != "fr" or index in errors:
+                continue
+            if site_data.installation_date in taken_dates:
+                errors[index] = FRENCH_SITE_PER_DAY_ERROR
+            else:
+                taken_dates.add(site_data.installation_date)
+
+        valid = [(index, site) for index, site in enumerate(sites_data) if index not in errors]
+        ids: dict[int, int] = {}
+        if valid:
+            # A concurrent writer may still take one of the dates after the check above
+            async with self.installation_date_guard():
+                ids = await self._insert_sites(valid)
+            self.touch(
+                group_ids={group_id for _, site in valid for group_id in site.groups or []},
+                tables=[Site.__tablename__],
+            )
+            self.mark_stats(list(ids.values()))
+            await self.commit()
+
+        return [
+            SiteBulkResult(index=index, id=ids.get(index), error=errors.get(index))
+            for index in range(len(sites_data))
+        ]
+
+    async def _insert_sites(self, sites_data: list[tuple[int, SiteCreate]]) -> dict[int, int]:
+        """Insert validated sites with multi-row INSERTs and return their ids by index."""
+        # Every country shares the `sites` table (single-table inheritance)
+        sites_table = Site.__table__
+        columns = {column.key for column in sites_table.c} - {"id", "version", "updated_at"}
+        result = await self.db.execute(
+            insert(sites_table).returning(sites_table.c.id, sort_by_parameter_order=True),
+            [site_data.model_dump(include=columns) for _, site_data in sites_data],
+        )
+        ids = {
+            index: site_id for (index, _), site_id in zip(sites_data, result.scalars(), strict=True)
+        }
+
+        memberships = [
+            {"site_id": ids[index], "group_id": group_id}
+            for index, site_data in sites_data
+            for group_id in dict.fromkeys(site_data.groups or [])
+        ]
+        if memberships:
+            await self.db.execute(insert(site_group_association), memberships)
+        return ids
+
     async def get_site(self, site_id: int) -> SiteOut:
-        """Retrieve a site by ID or raise 404 if not found."""
+        """Retrieve a site by ID, from the read cache when possible."""
+        _, site = await self.get_versioned_site(site_id)
+        return site
+
+    async def get_versioned_site(self, site_id: int) -> tuple[int, SiteOut]:
+        """Retrieve a site and the version it was read at."""
+        cached = site_cache.get(site_id)
+        if cached is not None:
+            return cached
+        generation = site_cache.generation()
+        site = await self.load_site(site_id)
+        entry = (site.version, self.to_schema(site))
+        # A lagging replica could refill the cache with what a write just invalidated
+        if not self.db.info.get("replica"):
+            site_cache.set(site_id, entry, generation)
+        return entry
+
+    async def get_site_version(self, site_id: int) -> int:
+        """Current version of a site, without loading it."""
+        cached = site_cache.peek(site_id)
+        if cached is not None:
+            return cached[0]
+        version = await self.db.scalar(select(Site.version).where(Site.id == site_id))
+        if version is None:
+            raise HTTPException(status_code=404, detail="Site not found")
+        return version
+
+    async def load_site(self, site_id: int) -> Site:
+        """Load a site and its groups by ID or raise 404 if not found."""
         site_entity = with_polymorphic(Site, [FrenchSite, ItalianSite])
         stmt = (
             select(site_entity).options(selectinload(site_entity.groups)).where(Site.id == site_id)
@@ -92,36 +312,421 @@ class SiteService(BaseService[Site, FrenchSite | ItalianSite]):
         return site
 
     async def update_site(self, site_id: int, site_data: SiteUpdate) -> SiteOut:
-        """Update an existing site with validations."""
-        await self.validate_group_ids_not_group3(site_data.groups or [])
-        site = await self.get_site(site_id)
-        if not site:
-            raise HTTPException(status_code=404, detail="Site not found")
+        """Update an existing site with validations.
 
+        The row is updated first and returned by the same statement, the rules are then
+        checked on the values it ends up with.
+        """
+        await self.validate_group_ids_not_group3(site_data.groups or [])
         update_data = site_data.model_dump(exclude_unset=True, exclude={"groups"})
-        installation_date = update_data.get("installation_date", site.installation_date)
-        country = update_data.get("country", site.country)
-        await self.validate_installation_constraints(installation_date, country, site.id)
-        for field, value in update_data.items():
-            setattr(site, field, value)
+        changes_stats = bool(site_data.groups) or not update_data.keys().isdisjoint(STATS_COLUMNS)
+        if update_data:
+            sites = Site.__table__
+            stmt = (
+                update(sites)
+                .where(sites.c.id == site_id)
+                .values(site_update_values(update_data))
+                .returning(*sites.c)
+            )
+            if changes_stats:
+                stmt = self.retract_stats([site_id], stmt)
+            async with self.installation_date_guard():
+                result = await self.db.execute(select(self.model_class).from_statement(stmt))
+            site = result.scalar_one_or_none()
+            if not site:
+                raise HTTPException(status_code=404, detail="Site not found")
+            try:
+                self.validate_installation_constraints(site.installation_date, site.country)
+            except HTTPException:
+                await self.db.rollback()
+                raise
+        else:
+            site = await self.load_site(site_id)
+            if changes_stats:
+                await self.db.execute(self.retract_stats([site_id]))
+        # Groups embed a summary of their sites
+        affected_groups = {group.id for group in site.groups}
         if site_data.groups:
             site.groups = await self.get_groups_by_ids(site_data.groups)
-        await self.db.commit()
-        await self.db.refresh(site)
+            affected_groups.update(site_data.groups)
+        if changes_stats:
+            self.mark_stats([site_id])
+        self.touch(site_ids=[site_id], group_ids=affected_groups)
+        await self.commit()
         return site
 
+    async def update_sites(
+        self, filters: dict, site_data: SiteBulkUpdate, dry_run: bool = False
+    ) -> BulkChangeResult:
+        """Update every site matching `filters` with a single UPDATE.
+
+        The rules are checked on the updated rows as a set: the weekend rule against the
+        countries the statement returns, the French one per day by its unique index. Country
+        specific fields are refused unless every matching site is of that country.
+        """
+        sites = Site.__table__
+        condition = self.filters_condition(filters)
+        update_data = site_data.model_dump(exclude_unset=True)
+        for key in sorted(update_data.keys() & COUNTRY_COLUMNS.keys()):
+            owner = COUNTRY_COLUMNS[key]
+            if await self.db.scalar(select(exists().where(condition, sites.c.country != owner))):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Field '{key}' only applies to sites of country '{owner}'.",
+                )
+        if dry_run:
+            count = await self.db.scalar(select(func.count()).where(condition))
+            return BulkChangeResult(affected=count, dry_run=True)
+        group_ids = (
+            select(func.array_agg(site_group_association.c.group_id))
+            .where(site_group_association.c.site_id == sites.c.id)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(sites)
+            .where(condition)
+            .values(site_update_values(update_data))
+            .returning(sites.c.id, sites.c.country, group_ids)
+        )
+        changes_stats = not update_data.keys().isdisjoint(STATS_COLUMNS)
+        if changes_stats:
+            stmt = self.retract_stats(select(sites.c.id).where(condition), stmt)
+        async with self.installation_date_guard():
+            rows = (await self.db.execute(stmt)).all()
+        if "installation_date" in update_data:
+            try:
+                for country in {row.country for row in rows}:
+                    self.validate_installation_constraints(
+                        update_data["installation_date"], country
+                    )
+            except HTTPException:
+                await self.db.rollback()
+                raise
+        if changes_stats:
+            self.mark_stats([row.id for row in rows])
+        # Groups embed a summary of their sites
+        self.touch(
+            site_ids=[row.id for row in rows],
+            group_ids={group_id for row in rows for group_id in row[2] or []},
+        )
+        await self.commit()
+        return BulkChangeResult(affected=len(rows), dry_run=False)
+
+    async def delete_sites_where(self, condition) -> list[int]:
+        """Delete the sites matching `condition` with their group memberships, in a single
+        statement, and return their ids."""
+        sites = Site.__table__
+        memberships = (
+            delete(site_group_association)
+            .where(site_group_association.c.site_id.in_(select(sites.c.id).where(condition)))
+            .returning(site_group_association.c.group_id)
+            .cte("memberships")
+        )
+        deleted = delete(sites).where(condition).returning(sites.c.id).cte("deleted")
+        stmt = select(
+            select(func.array_agg(memberships.c.group_id)).scalar_subquery(),
+            select(func.array_agg(deleted.c.id)).scalar_subquery(),
+        )
+        stmt = self.retract_stats(select(sites.c.id).where(condition), stmt)
+        group_ids, site_ids = (await self.db.execute(stmt)).one()
+        # Groups embed a summary of their sites
+        self.touch(site_ids=site_ids or [], group_ids=group_ids or [])
+        return site_ids or []
+
     async def delete_site(self, site_id: int):
         """Delete a site by ID."""
-        site = await self.db.get(Site, site_id)
-        if not site:
+        if not await self.delete_sites_where(Site.__table__.c.id == site_id):
             raise HTTPException(status_code=404, detail="Site not found")
-        await self.db.delete(site)
-        await self.db.commit()
+        await self.commit()
         return {"ok": True}
 
+    async def delete_sites(self, filters: dict, dry_run: bool = False) -> BulkChangeResult:
+        """Delete every site matching `filters`."""
+        condition = self.filters_condition(filters)
+        if dry_run:
+            count = await self.db.scalar(select(func.count()).where(condition))
+            return BulkChangeResult(affected=count, dry_run=True)
+        deleted = await self.delete_sites_where(condition)
+        await self.commit()
+        return BulkChangeResult(affected=len(deleted), dry_run=False)
+
     async def list_sites(
-        self, filters: dict | None = None, sort: str | None = None
-    ) -> list[SiteOut]:
-        """List all sites with optional filtering and sorting."""
-        res = await self.list_with_filters(filters, sort)
-        return res
+        self,
+        filters: dict | None = None,
+        sort: str | None = None,
+        limit: int | None = None,
+        after: str | None = None,
+        fields: list[str] | None = None,
+        expand: list[str] | None = None,
+        search: str | None = None,
+    ) -> Page[SiteOut | dict]:
+        """List sites with optional filtering, name search, sorting, keyset pagination and sparse
+        fieldsets."""
+        return await self.list_site_rows(
+            filters, sort, limit=limit, after=after, fields=fields, expand=expand, search=search
+        )
+
+    async def list_site_rows(
+        self,
+        filters: dict | None = None,
+        sort: str | None = None,
+        limit: int | None = None,
+        after: str | None = None,
+        conditions: list | None = None,
+        fields: list[str] | None = None,
+        expand: list[str] | None = None,
+        search: str | None = None,
+    ) -> Page[SiteOut | dict]:
+        """List sites from projected rows, see `present_sites`."""
+        page = await self.list_rows_with_filters(
+            self.site_columns(fields),
+            filters,
+            sort,
+            limit=limit,
+            after=after,
+            conditions=conditions,
+            search=search,
+        )
+        page.items = await self.present_sites(page.items, fields, expand)
+        return page
+
+    @staticmethod
+    def sparse_fieldset(
+        fields: str | None, expand: str | None
+    ) -> tuple[list[str] | None, list[str] | None]:
+        """Parse the `fields` and `expand` query parameters, rejecting unknown names."""
+        return (
+            parse_field_list(fields, SITE_FIELDS, "fields"),
+            parse_field_list(expand, SITE_RELATIONS, "expand"),
+        )
+
+    @staticmethod
+    def site_columns(fields: list[str] | None) -> list:
+        """Columns to project for the requested fields, all of them by default."""
+        if fields is None:
+            return SITE_COLUMNS
+        return [column for column in SITE_COLUMNS if column.key in fields]
+
+    async def present_sites(
+        self, rows: list[dict], fields: list[str] | None, expand: list[str] | None
+    ) -> list[SiteOut | dict]:
+        """Turn listing rows into the response items.
+
+        Without `fields` nor `expand`, every row is validated once by the schema of its
+        country. Otherwise only the requested columns and relationships are returned, as is.
+        """
+        if fields is None and expand is None:
+            await self.expand_rows(rows, SITE_RELATIONS)
+            return [SITE_ADAPTERS[row["country"]].validate_python(row) for row in rows]
+        expand = expand or []
+        await self.expand_rows(rows, expand)
+        return [
+            {key: row[key] for key in (*(fields or SITE_COUNTRY_FIELDS[row["country"]]), *expand)}
+            for row in rows
+        ]
+
+    @staticmethod
+    def to_schema(site: Site) -> BaseModel:
+        """Serialize a site with the output schema of its country."""
+        return SITE_SCHEME_OUT[site.country].model_validate(site)
+
+    async def group_sites_condition(self, group_id: int):
+        """Condition selecting the sites directly in a group, 404 when it does not exist."""
+        if await self.db.scalar(select(Group.id).where(Group.id == group_id)) is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return Site.id.in_(
+            select(site_group_association.c.site_id).where(
+                site_group_association.c.group_id == group_id
+            )
+        )
+
+    async def list_sites_in_group_tree(
+        self,
+        group_id: int,
+        filters: dict | None = None,
+        sort: str | None = None,
+        limit: int | None = None,
+        after: str | None = None,
+    ) -> Page[SiteOut]:
+        """List the sites of a group and of all the groups below it."""
+        if await self.db.scalar(select(Group.id).where(Group.id == group_id)) is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        member_ids = (
+            select(site_group_association.c.site_id)
+            .join(group_closure, group_closure.c.descendant_id == site_group_association.c.group_id)
+            .where(group_closure.c.ancestor_id == group_id)
+        )
+        return await self.list_site_rows(
+            filters, sort, limit=limit, after=after, conditions=[Site.id.in_(member_ids)]
+        )
+
+    async def site_stats(
+        self, group_by: list[str], filters: dict | None = None, rollup: bool = False
+    ) -> list[SiteStats]:
+        """Aggregate the matching sites per `group_by` keys in a single GROUP BY query.
+
+        A site counts in every group it belongs to, directly or through child groups. With
+        `rollup`, subtotals over the trailing keys and a grand total are appended.
+        """
+        table = Site.__table__
+        measures = [
+            getattr(func, aggregate)(table.c[name]).label(f"{name}_{aggregate}")
+            for name, aggregates in STATS_MEASURES.items()
+            for aggregate in aggregates
+        ]
+        stmt = self.filtered_query_builder(filters).build_aggregate(
+            func.count().label("site_count"), *measures
+        )
+        dimensions = {
+            "country": table.c.country,
+            "month": func.to_char(table.c.installation_date, "YYYY-MM").label("month"),
+        }
+        if "group" in group_by:
+            membership = group_membership().subquery("membership")
+            stmt = stmt.join(membership, membership.c.site_id == table.c.id)
+            dimensions["group"] = membership.c.group_id
+        keys = [dimensions[name] for name in group_by]
+        if keys:
+            stmt = stmt.add_columns(*keys)
+            stmt = stmt.group_by(func.rollup(*keys)) if rollup else stmt.group_by(*keys)
+            stmt = stmt.order_by(*(key.asc().nulls_last() for key in keys))
+        rows = await self.db.execute(stmt)
+        return SITE_STATS_ADAPTER.validate_python([row._asdict() for row in rows])
+
+    async def scoped_query_builder(self, scope: SiteScope) -> QueryBuilder:
+        """Query builder over the sites of `scope`, 404 when its group does not exist."""
+        builder = self.filtered_query_builder(scope.filters or None)
+        if scope.group_id is not None:
+            if await self.db.scalar(select(Group.id).where(Group.id == scope.group_id)) is None:
+                raise HTTPException(status_code=404, detail="Group not found")
+            membership = group_membership([scope.group_id]).subquery("membership")
+            builder.where(Site.id.in_(select(membership.c.site_id)))
+        return builder
+
+    async def estimate_production(self, request: SiteEstimateRequest) -> SiteEstimate:
+        """Expected energy of the matching sites, in one vectorized pass per country.
+
+        Each country's parameters come back as one array per column (`array_agg`) instead of
+        a row per site, and go straight into NumPy.
+        """
+        builder = await self.scoped_query_builder(request)
+        table = Site.__table__
+        stmt = (
+            builder.build_aggregate(
+                table.c.country,
+                func.array_agg(table.c.min_power_megawatt),
+                func.array_agg(table.c.max_power_megawatt),
+                func.array_agg(SITE_OUTPUT_FACTOR),
+            )
+            .where(table.c.country.in_(COUNTRY_OUTPUT_FACTORS))
+            .group_by(table.c.country)
+            .order_by(table.c.country)
+        )
+        batches = [CountryBatch.from_columns(*row) for row in await self.db.execute(stmt)]
+        return SiteEstimate.model_validate(summarize(batches, request.hours, request.load_factor))
+
+    async def simulate_production(self, scenario_data: SimulationRequest) -> dict:
+        """Daily production per country and group of the scenario sites over its period.
+
+        Sites are read one id range at a time (keyset on id), each range simulated by a process
+        pool worker while the next ones are read, and the partial sums added up here as they
+        come: memory follows the chunk size and the number of workers, not the table.
+        """
+        table = Site.__table__
+        countries = sorted(COUNTRY_OUTPUT_FACTORS)
+        builder = await self.scoped_query_builder(scenario_data)
+        builder.where(table.c.country.in_(countries))
+        membership = group_membership().subquery("membership")
+        group_ids = await self.db.scalars(
+            select(membership.c.group_id)
+            .where(membership.c.site_id.in_(builder.build_aggregate(table.c.id)))
+            .distinct()
+            .order_by(membership.c.group_id)
+        )
+        groups = np.asarray(group_ids.all(), dtype=np.int64)
+        scenario = Scenario(
+            first_day=int(np.datetime64(scenario_data.start, "D").astype(np.int64)),
+            days=scenario_data.days,
+            curtailment=scenario_data.curtailment,
+            degradation_per_year=scenario_data.degradation_per_year,
+            country_count=len(countries),
+            group_count=len(groups),
+        )
+        loop = asyncio.get_running_loop()
+        country_series = np.zeros((scenario.country_count, scenario.days))
+        group_series = np.zeros((scenario.group_count, scenario.days))
+        partials = deque()
+        async for chunk in self.simulation_chunks(builder, countries, groups):
+            partials.append(loop.run_in_executor(process_pool(), simulate_chunk, chunk, scenario))
+            # Read ahead only as far as the workers keep up, so partial sums do not pile up
+            while partials and (len(partials) > process_pool_size() or partials[0].done()):
+                chunk_countries, chunk_groups = await partials.popleft()
+                country_series += chunk_countries
+                group_series += chunk_groups
+        for partial in partials:
+            chunk_countries, chunk_groups = await partial
+            country_series += chunk_countries
+            group_series += chunk_groups
+        return {
+            "start": scenario_data.start,
+            "days": scenario_data.days,
+            "countries": dict(zip(countries, country_series.tolist(), strict=True)),
+            "groups": dict(zip(groups.tolist(), group_series.tolist(), strict=True)),
+        }
+
+    async def simulation_chunks(
+        self, builder: QueryBuilder, countries: list[str], groups: np.ndarray
+    ) -> AsyncIterator[SimulationChunk]:
+        """Chunks of the sites of `builder`, `simulation_sites_per_chunk` at a time by id."""
+        table = Site.__table__
+        columns = (
+            table.c.id,
+            table.c.min_power_megawatt,
+            table.c.max_power_megawatt,
+            SITE_OUTPUT_FACTOR.label("output_factor"),
+            table.c.installation_date,
+            table.c.country,
+        )
+        sites_per_chunk = get_settings().simulation_sites_per_chunk
+        last_id = None
+        while True:
+            page = builder.build_aggregate(*columns).order_by(table.c.id).limit(sites_per_chunk)
+            if last_id is not None:
+                page = page.where(table.c.id > last_id)
+            page = page.subquery("chunk")
+            stmt = select(
+                *(func.array_agg(aggregate_order_by(column, page.c.id)) for column in page.c)
+            )
+            site_columns = (await self.db.execute(stmt)).one()
+            ids = site_columns[0]
+            if not ids:
+                return
+            membership = (
+                group_membership()
+                .where(site_group_association.c.site_id.between(ids[0], ids[-1]))
+                .subquery("membership")
+            )
+            member_ids, member_group_ids = (
+                values or []
+                for values in (
+                    await self.db.execute(
+                        select(
+                            func.array_agg(membership.c.site_id),
+                            func.array_agg(membership.c.group_id),
+                        )
+                    )
+                ).one()
+            )
+            yield SimulationChunk.from_columns(
+                countries, groups, *site_columns, member_ids, member_group_ids
+            )
+            if len(ids) < sites_per_chunk:
+                return
+            last_id = ids[-1]
+
+    async def stream_sites(
+        self, stmt, fields: list[str] | None = None, expand: list[str] | None = None
+    ) -> AsyncIterator[list[SiteOut | dict]]:
+        """Stream the sites of a `stream_statement` query in serialized batches."""
+        async for rows in self.stream_rows(stmt):
+            yield await self.present_sites(rows, fields, expand)
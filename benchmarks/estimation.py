@@ -0,0 +1,99 @@
+"""
+Compare estimating portfolio production with NumPy arrays and with a per-site Python loop.
+
+Both paths read the same sites from a throwaway schema of the target database. The loop path
+loads one row per site and accumulates in Python; the vectorized path is
+`SiteService.estimate_production`, which aggregates each country's columns into arrays:
+
+    PYTHONPATH=app python benchmarks/estimation.py --sites 1000000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from config import get_settings
+from infrastructure.db import Base
+from infrastructure.models import Site
+from schemas import SiteEstimateRequest
+from services.sites import SiteService
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+SCHEMA = "bench_estimation"
+
+
+def generate_sites(count: int) -> list[dict]:
+    start = date(2020, 1, 1)
+    return [
+        {
+            "id": site_id,
+            "name": f"site-{site_id}",
+            "installation_date": start + timedelta(days=site_id),
+            "max_power_megawatt": 10.0 + site_id % 7,
+            "min_power_megawatt": 1.0 + site_id % 3,
+            "country": "fr" if site_id % 2 else "it",
+            "useful_energy_at_1_megawatt": 0.5 if site_id % 2 else None,
+            "efficiency": None if site_id % 2 else 0.9,
+        }
+        for site_id in range(1, count + 1)
+    ]
+
+
+async def loop_path(session: AsyncSession, request: SiteEstimateRequest) -> float:
+    table = Site.__table__
+    result = await session.execute(select(table))
+    total = 0.0
+    for site in result.mappings():
+        factor = site["useful_energy_at_1_megawatt"] or site["efficiency"]
+        power = site["min_power_megawatt"] + request.load_factor * (
+            site["max_power_megawatt"] - site["min_power_megawatt"]
+        )
+        total += power * factor * request.hours
+    return total
+
+
+async def numpy_path(session: AsyncSession, request: SiteEstimateRequest) -> float:
+    estimate = await SiteService(session).estimate_production(request)
+    return estimate.expected_energy_megawatt_hour
+
+
+async def main(site_count: int, repeat: int) -> None:
+    engine = create_async_engine(get_settings().target_db_url)
+    request = SiteEstimateRequest(hours=24, load_factor=0.8)
+    try:
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+        translated = engine.execution_options(schema_translate_map={None: SCHEMA})
+        async with translated.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            sites = generate_sites(site_count)
+            for offset in range(0, site_count, 5000):
+                await conn.execute(insert(Site.__table__), sites[offset : offset + 5000])
+
+        print(f"{site_count} sites, best of {repeat}")
+        print(f"{'path':<6} {'total ms':>10}")
+        totals = {}
+        for name, path in (("loop", loop_path), ("numpy", numpy_path)):
+            timings = []
+            for _ in range(repeat):
+                async with AsyncSession(translated) as session:
+                    started = time.perf_counter()
+                    totals[name] = await path(session, request)
+                    timings.append(time.perf_counter() - started)
+            print(f"{name:<6} {min(timings) * 1000:>10.1f}")
+        assert abs(totals["loop"] - totals["numpy"]) <= 1e-6 * totals["loop"]
+    finally:
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sites", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.sites, args.repeat))
@@ -0,0 +1,109 @@
+"""
+Compare the per-row cost of serializing a site listing through the ORM and the row path.
+
+The ORM path loads entities, validates them once in the service and once more against the
+`SiteOut` response model like FastAPI does, then encodes with the standard json module. The
+row path projects columns, validates each row once with its country's `TypeAdapter` and
+encodes with orjson. Sites are created in a throwaway schema of the target database:
+
+    PYTHONPATH=app python benchmarks/serialization.py --sites 100000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+
+from config import get_settings
+from fastapi.responses import ORJSONResponse
+from infrastructure.db import Base
+from infrastructure.models import Group, GroupType, Site
+from infrastructure.models.site_group import site_group_association
+from pydantic import TypeAdapter
+from schemas import SiteOut
+from services.sites import SiteService
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+SCHEMA = "bench_serialization"
+RESPONSE_ADAPTER = TypeAdapter(list[SiteOut])
+
+
+def generate_sites(count: int) -> list[dict]:
+    start = date(2020, 1, 1)
+    sites = []
+    for site_id in range(1, count + 1):
+        site = {
+            "id": site_id,
+            "name": f"site-{site_id}",
+            "installation_date": start + timedelta(days=site_id),
+            "max_power_megawatt": 10.0,
+            "min_power_megawatt": 1.0,
+            "country": "fr" if site_id % 2 else "it",
+            "useful_energy_at_1_megawatt": None,
+            "efficiency": None,
+        }
+        if site["country"] == "fr":
+            site["useful_energy_at_1_megawatt"] = 0.5
+        else:
+            site["efficiency"] = 0.9
+        sites.append(site)
+    return sites
+
+
+async def orm_path(service: SiteService) -> bytes:
+    page = await service.list_with_filters(sort="id")
+    items = [service.to_schema(site) for site in page.items]
+    # FastAPI validates the returned value against the response model, then encodes it
+    validated = RESPONSE_ADAPTER.validate_python(items, from_attributes=True)
+    return json.dumps(RESPONSE_ADAPTER.dump_python(validated, mode="json")).encode()
+
+
+async def row_path(service: SiteService) -> bytes:
+    page = await service.list_sites(sort="id")
+    return ORJSONResponse([item.model_dump() for item in page.items]).body
+
+
+async def main(site_count: int, repeat: int) -> None:
+    engine = create_async_engine(get_settings().target_db_url)
+    try:
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+        translated = engine.execution_options(schema_translate_map={None: SCHEMA})
+        async with translated.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            sites = generate_sites(site_count)
+            await conn.execute(insert(Group), [{"id": 1, "name": "g1", "type": GroupType.group1}])
+            for offset in range(0, site_count, 5000):
+                await conn.execute(insert(Site.__table__), sites[offset : offset + 5000])
+            await conn.execute(
+                insert(site_group_association),
+                [{"site_id": site["id"], "group_id": 1} for site in sites],
+            )
+
+        print(f"{site_count} sites, best of {repeat}")
+        print(f"{'path':<6} {'total ms':>10} {'us/row':>8}")
+        for name, path in (("orm", orm_path), ("rows", row_path)):
+            timings = []
+            for _ in range(repeat):
+                async with AsyncSession(translated) as session:
+                    started = time.perf_counter()
+                    body = await path(SiteService(session))
+                    timings.append(time.perf_counter() - started)
+            assert json.loads(body)[0]["id"] == 1
+            best = min(timings)
+            print(f"{name:<6} {best * 1000:>10.1f} {best / site_count * 1e6:>8.2f}")
+    finally:
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sites", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.sites, args.repeat))
@@ -0,0 +1,176 @@
+"""
+Compare site listing latency between the joined-table and single-table layouts.
+
+Both layouts are created in throwaway schemas of the target database, filled with the same
+sites spread over `--countries` countries, then the same paginated listing is timed:
+
+    PYTHONPATH=app python benchmarks/site_layouts.py --countries 12 --sites 100000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from config import get_settings
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, MetaData, String, Table, select
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+BASE_COLUMNS = ("name", "installation_date", "max_power_megawatt", "min_power_megawatt")
+
+
+def base_site_columns() -> list[Column]:
+    return [
+        Column("id", Integer, primary_key=True),
+        Column("name", String, nullable=False),
+        Column("installation_date", Date, nullable=False),
+        Column("max_power_megawatt", Float, nullable=False),
+        Column("min_power_megawatt", Float, nullable=False),
+        Column("country", String, nullable=False),
+    ]
+
+
+def joined_layout(countries: list[str]) -> tuple[MetaData, Table, dict[str, Table]]:
+    """`sites` plus one table per country holding its specific attribute."""
+    metadata = MetaData(schema="bench_joined")
+    sites = Table("sites", metadata, *base_site_columns())
+    country_tables = {
+        country: Table(
+            f"{country}_sites",
+            metadata,
+            Column("id", Integer, ForeignKey(sites.c.id), primary_key=True),
+            Column(f"{country}_attribute", Float, nullable=False),
+        )
+        for country in countries
+    }
+    return metadata, sites, country_tables
+
+
+def single_layout(countries: list[str]) -> tuple[MetaData, Table]:
+    """`sites` holding every country's attribute as a nullable column."""
+    metadata = MetaData(schema="bench_single")
+    sites = Table(
+        "sites",
+        metadata,
+        *base_site_columns(),
+        *(Column(f"{country}_attribute", Float) for country in countries),
+    )
+    return metadata, sites
+
+
+def generate_sites(countries: list[str], count: int) -> list[dict]:
+    start = date(2020, 1, 1)
+    return [
+        {
+            "id": site_id,
+            "name": f"site-{site_id}",
+            "installation_date": start + timedelta(days=site_id % 2000),
+            "max_power_megawatt": random.uniform(1, 10),
+            "min_power_megawatt": random.uniform(0, 1),
+            "country": countries[site_id % len(countries)],
+            "attribute": random.random(),
+        }
+        for site_id in range(1, count + 1)
+    ]
+
+
+async def load(
+    conn: AsyncConnection, table: Table, rows: list[dict], batch_size: int = 5000
+) -> None:
+    for offset in range(0, len(rows), batch_size):
+        await conn.execute(table.insert(), rows[offset : offset + batch_size])
+
+
+async def time_query(conn: AsyncConnection, stmt, repeat: int) -> list[float]:
+    await conn.execute(stmt)  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        (await conn.execute(stmt)).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main(country_count: int, site_count: int, page_size: int, repeat: int) -> None:
+    countries = [f"c{index:02d}" for index in range(country_count)]
+    rows = generate_sites(countries, site_count)
+    engine = create_async_engine(get_settings().target_db_url)
+
+    joined_metadata, joined_sites, country_tables = joined_layout(countries)
+    single_metadata, single_sites = single_layout(countries)
+
+    # Same shape as SiteService: every site with its country specific attributes
+    joined_from = joined_sites
+    for table in country_tables.values():
+        joined_from = joined_from.outerjoin(table, table.c.id == joined_sites.c.id)
+    joined_columns = [joined_sites.c[name] for name in ("id", *BASE_COLUMNS, "country")]
+    joined_columns += [table.c[f"{country}_attribute"] for country, table in country_tables.items()]
+    queries = {
+        "joined": lambda page: select(*joined_columns)
+        .select_from(joined_from)
+        .where(joined_sites.c.id > page)
+        .order_by(joined_sites.c.id)
+        .limit(page_size),
+        "single": lambda page: select(single_sites)
+        .where(single_sites.c.id > page)
+        .order_by(single_sites.c.id)
+        .limit(page_size),
+    }
+
+    try:
+        async with engine.begin() as conn:
+            for schema in ("bench_joined", "bench_single"):
+                await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+                await conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+            await conn.run_sync(joined_metadata.create_all)
+            await conn.run_sync(single_metadata.create_all)
+
+            base_keys = ("id", *BASE_COLUMNS, "country")
+            attributes = [f"{country}_attribute" for country in countries]
+            await load(conn, joined_sites, [{key: row[key] for key in base_keys} for row in rows])
+            for country, table in country_tables.items():
+                country_rows = [
+                    {"id": row["id"], f"{country}_attribute": row["attribute"]}
+                    for row in rows
+                    if row["country"] == country
+                ]
+                await load(conn, table, country_rows)
+            await load(
+                conn,
+                single_sites,
+                [
+                    {
+                        **{key: row[key] for key in base_keys},
+                        **dict.fromkeys(attributes),
+                        f"{row['country']}_attribute": row["attribute"],
+                    }
+                    for row in rows
+                ],
+            )
+            for schema in ("bench_joined", "bench_single"):
+                await conn.exec_driver_sql(f"ANALYZE {schema}.sites")
+
+        async with engine.connect() as conn:
+            print(f"{site_count} sites, {country_count} countries, pages of {page_size} rows")
+            print(f"{'layout':<8} {'first page':>12} {'deep page':>12}  (median ms)")
+            for layout, query in queries.items():
+                first = statistics.median(await time_query(conn, query(0), repeat))
+                deep = statistics.median(await time_query(conn, query(site_count // 2), repeat))
+                print(f"{layout:<8} {first:>12.2f} {deep:>12.2f}")
+    finally:
+        async with engine.begin() as conn:
+            for schema in ("bench_joined", "bench_single"):
+                await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--countries", type=int, default=12)
+    parser.add_argument("--sites", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.countries, args.sites, args.page_size, args.repeat))
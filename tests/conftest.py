@@ -1,5 +1,6 @@
 import asyncio
 from collections.abc import AsyncGenerator
+from contextlib import contextmanager
 from datetime import date
 
 import pytest
@@ -7,7 +8,8 @@ from httpx import ASGITransport, AsyncClient
 from infrastructure.db import Base, engine
 from infrastructure.models import FrenchSite, Group, GroupType, ItalianSite, Site
 from main import app
-from sqlalchemy import text
+from services.cache import group_cache, site_cache
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 TestingSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
@@ -38,6 +40,8 @@ async def setup_database(db_session):
         for table in reversed(Base.metadata.sorted_tables):
             await session.execute(text(f"DELETE FROM {table.name}"))
         await session.commit()
+    site_cache.clear()
+    group_cache.clear()
 
 
 @pytest.fixture
@@ -48,6 +52,26 @@ async def async_client() -> AsyncGenerator[AsyncClient, None]:
         yield client
 
 
+@pytest.fixture
+def record_statements():
+    """Context manager collecting the SQL statements sent to the database while active."""
+
+    @contextmanager
+    def record():
+        statements = []
+
+        def append(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", append)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", append)
+
+    return record
+
+
 @pytest.fixture
 def sample_fr_site_data():
     """Sample site data for testing."""
@@ -171,3 +195,15 @@ async def multiple_groups(db_session: AsyncSession) -> list[Group]:
         await db_session.refresh(group)
 
     return groups
+
+
+@pytest.fixture
+async def group_hierarchy(db_session: AsyncSession) -> dict[str, Group]:
+    """Create a root group containing a and b, with a and b containing each other."""
+    a = Group(name="A", type=GroupType.group2)
+    b = Group(name="B", type=GroupType.group2, child_groups=[a])
+    a.child_groups = [b]
+    root = Group(name="Root", type=GroupType.group1, child_groups=[a, b])
+    db_session.add(root)
+    await db_session.commit()
+    return {"root": root, "a": a, "b": b}
@@ -1,6 +1,7 @@
 import pytest
 from httpx import AsyncClient
 from infrastructure.models import Group
+from services.base import DEFAULT_PAGE_SIZE
 
 
 class TestGroupsAPI:
@@ -54,6 +55,37 @@ class TestGroupsAPI:
         assert len(data) == 3
         assert all("id" in group for group in data)
 
+    @pytest.mark.asyncio
+    async def test_list_groups_includes_relationships(
+        self, async_client: AsyncClient, sample_group: Group, sample_fr_site
+    ):
+        """Test listed groups embed their child groups and sites."""
+        response = await async_client.post(
+            "/api/groups",
+            json={
+                "name": "Parent",
+                "type": "group2",
+                "child_groups": [sample_group.id],
+                "sites": [sample_fr_site.id],
+            },
+        )
+        parent_id = response.json()["id"]
+
+        response = await async_client.get("/api/groups?name=Parent")
+        assert response.status_code == 200
+        assert response.json() == [
+            {
+                "id": parent_id,
+                "name": "Parent",
+                "type": "group2",
+                "child_groups": [{"id": sample_group.id, "name": sample_group.name}],
+                "sites": [{"id": sample_fr_site.id, "name": sample_fr_site.name}],
+            }
+        ]
+
+        response = await async_client.get("/api/sites")
+        assert response.json()[0]["groups"] == [{"id": parent_id, "name": "Parent"}]
+
     @pytest.mark.asyncio
     async def test_list_groups_with_filters(self, async_client: AsyncClient, multiple_groups):
         """Test groups listing with filters."""
@@ -95,6 +127,364 @@ class TestGroupsAPI:
         ids = [group["id"] for group in data]
         assert ids == sorted(ids)
 
+    @pytest.mark.asyncio
+    async def test_list_groups_keyset_pagination(self, async_client: AsyncClient, multiple_groups):
+        """Test groups pagination returns every group exactly once."""
+        response = await async_client.get("/api/groups?limit=2")
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page) == 2
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = await async_client.get(f"/api/groups?limit=2&after={cursor}")
+        assert response.status_code == 200
+        second_page = response.json()
+        assert len(second_page) == 1
+        assert "X-Next-Cursor" not in response.headers
+
+        ids = [group["id"] for group in first_page + second_page]
+        assert ids == sorted(group.id for group in multiple_groups)
+
+        # A cursor is bound to the sort it was produced with
+        response = await async_client.get(f"/api/groups?limit=2&sort=name&after={cursor}")
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_list_groups_default_page_size(self, async_client: AsyncClient, db_session):
+        """Test a listing without `limit` returns one default sized page and a cursor."""
+        db_session.add_all(
+            Group(name=f"Group {index:03}", type="group1") for index in range(DEFAULT_PAGE_SIZE + 1)
+        )
+        await db_session.commit()
+
+        response = await async_client.get("/api/groups")
+        assert response.status_code == 200
+        assert len(response.json()) == DEFAULT_PAGE_SIZE
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = await async_client.get(f"/api/groups?after={cursor}")
+        assert len(response.json()) == 1
+        assert "X-Next-Cursor" not in response.headers
+
+        # Exports go through the stream, which is not paged
+        response = await async_client.get("/api/groups?stream=true")
+        assert len(response.json()) == DEFAULT_PAGE_SIZE + 1
+
+    @pytest.mark.asyncio
+    async def test_list_groups_streaming(self, async_client: AsyncClient, multiple_groups):
+        """Test streaming the groups listing."""
+        response = await async_client.get("/api/groups?stream=true&sort=-name")
+        assert response.status_code == 200
+        names = [group["name"] for group in response.json()]
+        assert names == sorted((group.name for group in multiple_groups), reverse=True)
+
+        response = await async_client.get("/api/groups?stream=true&name=missing")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_get_group_tree(self, async_client: AsyncClient, group_hierarchy: dict):
+        """Test the nested hierarchy is resolved without looping on cycles."""
+        root, a, b = group_hierarchy["root"], group_hierarchy["a"], group_hierarchy["b"]
+        response = await async_client.get(f"/api/groups/{root.id}/tree")
+        assert response.status_code == 200
+        tree = response.json()
+        assert tree["id"] == root.id
+        children = {child["id"]: child for child in tree["children"]}
+        assert set(children) == {a.id, b.id}
+        assert [child["id"] for child in children[a.id]["children"]] == [b.id]
+        assert [child["id"] for child in children[b.id]["children"]] == [a.id]
+        assert children[a.id]["children"][0]["children"] == []
+
+        response = await async_client.get(f"/api/groups/{root.id}/tree?max_depth=0")
+        assert response.json()["children"] == []
+
+    @pytest.mark.asyncio
+    async def test_get_group_descendants(self, async_client: AsyncClient, group_hierarchy: dict):
+        """Test descendants are listed once each at their shortest depth."""
+        root, a, b = group_hierarchy["root"], group_hierarchy["a"], group_hierarchy["b"]
+        response = await async_client.get(f"/api/groups/{root.id}/descendants")
+        assert response.status_code == 200
+        assert [(group["id"], group["depth"]) for group in response.json()] == [
+            (a.id, 1),
+            (b.id, 1),
+        ]
+
+        response = await async_client.get(f"/api/groups/{a.id}/descendants")
+        assert [(group["id"], group["depth"]) for group in response.json()] == [(b.id, 1)]
+
+        response = await async_client.get("/api/groups/999/descendants")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_transitive_membership(self, async_client: AsyncClient, sample_fr_site):
+        """Test the closure table follows hierarchy changes."""
+        leaf = await async_client.post(
+            "/api/groups", json={"name": "Leaf", "type": "group1", "sites": [sample_fr_site.id]}
+        )
+        leaf_id = leaf.json()["id"]
+        mid = await async_client.post(
+            "/api/groups", json={"name": "Mid", "type": "group1", "child_groups": [leaf_id]}
+        )
+        mid_id = mid.json()["id"]
+        top = await async_client.post(
+            "/api/groups", json={"name": "Top", "type": "group2", "child_groups": [mid_id]}
+        )
+        top_id = top.json()["id"]
+
+        response = await async_client.get(f"/api/groups/{top_id}/all-sites")
+        assert response.status_code == 200
+        assert [site["id"] for site in response.json()] == [sample_fr_site.id]
+
+        response = await async_client.get(f"/api/sites/{sample_fr_site.id}/ancestor-groups")
+        assert response.status_code == 200
+        assert [(group["id"], group["depth"]) for group in response.json()] == [
+            (leaf_id, 0),
+            (mid_id, 1),
+            (top_id, 2),
+        ]
+
+        # Moving the leaf out of the hierarchy detaches the site from mid and top
+        other = await async_client.post("/api/groups", json={"name": "Other", "type": "group1"})
+        await async_client.patch(
+            f"/api/groups/{mid_id}", json={"child_groups": [other.json()["id"]]}
+        )
+        response = await async_client.get(f"/api/groups/{top_id}/all-sites")
+        assert response.json() == []
+        response = await async_client.get(f"/api/sites/{sample_fr_site.id}/ancestor-groups")
+        assert [group["id"] for group in response.json()] == [leaf_id]
+
+        response = await async_client.get("/api/groups/999/all-sites")
+        assert response.status_code == 404
+        response = await async_client.get("/api/sites/999/ancestor-groups")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_group_stats_follow_writes(self, async_client: AsyncClient, multiple_sites):
+        """Test the maintained group totals follow site and hierarchy changes."""
+        solar, other_solar, italian = (site.id for site in multiple_sites)
+        leaf = await async_client.post(
+            "/api/groups", json={"name": "Leaf", "type": "group1", "sites": [solar]}
+        )
+        leaf_id = leaf.json()["id"]
+        top = await async_client.post(
+            "/api/groups",
+            json={"name": "Top", "type": "group2", "child_groups": [leaf_id], "sites": [solar]},
+        )
+        top_id = top.json()["id"]
+
+        async def totals(group_id: int) -> tuple:
+            data = (await async_client.get(f"/api/groups/{group_id}/stats")).json()
+            return data["site_count"], data["max_power_megawatt_sum"]
+
+        # A site reached directly and through a child group counts once
+        assert await totals(top_id) == (1, 50.0)
+
+        await async_client.patch(f"/api/sites/{other_solar}", json={"groups": [leaf_id]})
+        assert await totals(leaf_id) == (2, 125.0)
+        assert await totals(top_id) == (2, 125.0)
+
+        await async_client.patch(f"/api/sites/{other_solar}", json={"max_power_megawatt": 80})
+        assert await totals(top_id) == (2, 130.0)
+
+        await async_client.patch(f"/api/groups/{top_id}", json={"sites": [italian]})
+        await async_client.delete(f"/api/sites/{solar}")
+        assert await totals(leaf_id) == (1, 80.0)
+        assert await totals(top_id) == (2, 110.0)
+
+        response = await async_client.get("/api/groups/999/stats")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_group_writes_round_trips(
+        self, async_client: AsyncClient, multiple_sites, record_statements
+    ):
+        """Test group writes stay within their budget of SQL statements."""
+        with record_statements() as statements:
+            child = await async_client.post("/api/groups", json={"name": "Child", "type": "group1"})
+        assert child.status_code == 200
+        assert len(statements) == 3
+        child_id = child.json()["id"]
+        parent = await async_client.post(
+            "/api/groups", json={"name": "Parent", "type": "group1", "child_groups": [child_id]}
+        )
+
+        with record_statements() as statements:
+            response = await async_client.patch(f"/api/groups/{child_id}", json={"name": "Leaf"})
+        assert response.status_code == 200
+        assert len(statements) == 5
+
+        # A group below another one is unlinked from it
+        with record_statements() as statements:
+            response = await async_client.delete(f"/api/groups/{child_id}")
+        assert response.status_code == 200
+        assert len(statements) == 2
+        response = await async_client.get(f"/api/groups/{parent.json()['id']}")
+        assert response.json()["child_groups"] == []
+
+        linked = await async_client.post(
+            "/api/groups",
+            json={"name": "Linked", "type": "group1", "sites": [multiple_sites[0].id]},
+        )
+        response = await async_client.delete(f"/api/groups/{linked.json()['id']}")
+        assert response.status_code == 400
+        response = await async_client.get(f"/api/groups/{linked.json()['id']}")
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_incremental_membership(
+        self, async_client: AsyncClient, multiple_sites, record_statements
+    ):
+        """Test adding and removing members touches the given ids only."""
+        solar, other_solar, italian = (site.id for site in multiple_sites)
+        group = await async_client.post(
+            "/api/groups", json={"name": "Portfolio", "type": "group1", "sites": [solar]}
+        )
+        group_id = group.json()["id"]
+
+        # Type check, membership insert, then versions and stats together
+        with record_statements() as statements:
+            response = await async_client.post(
+                f"/api/groups/{group_id}/sites:add", json={"ids": [solar, other_solar]}
+            )
+        assert response.status_code == 200
+        assert response.json() == {"group_id": group_id, "changed": [other_solar]}
+        assert len(statements) == 3
+        # Stats move by the contribution of the given sites instead of being recomputed
+        assert "retracted_stats" in statements[1]
+        assert "GROUP BY groups.id" not in statements[2]
+        stats = (await async_client.get(f"/api/groups/{group_id}/stats")).json()
+        assert stats["site_count"] == 2
+
+        response = await async_client.post(
+            f"/api/groups/{group_id}/sites:add", json={"ids": [italian, 999999]}
+        )
+        assert response.status_code == 404
+        response = await async_client.post(
+            f"/api/groups/{group_id}/sites:remove", json={"ids": [solar, italian]}
+        )
+        assert response.json()["changed"] == [solar]
+        response = await async_client.get(f"/api/groups/{group_id}")
+        assert [site["id"] for site in response.json()["sites"]] == [other_solar]
+
+        child = await async_client.post("/api/groups", json={"name": "Child", "type": "group3"})
+        child_id = child.json()["id"]
+        response = await async_client.post(
+            f"/api/groups/{child_id}/sites:add", json={"ids": [solar]}
+        )
+        assert response.status_code == 400
+        response = await async_client.post(
+            f"/api/groups/{group_id}/child_groups:add", json={"ids": [child_id]}
+        )
+        assert response.json()["changed"] == [child_id]
+        response = await async_client.get(f"/api/groups/{group_id}/descendants")
+        assert [group["id"] for group in response.json()] == [child_id]
+        response = await async_client.post(
+            f"/api/groups/{group_id}/child_groups:remove", json={"ids": [child_id]}
+        )
+        assert response.json()["changed"] == [child_id]
+        response = await async_client.get(f"/api/groups/{group_id}/descendants")
+        assert response.json() == []
+
+        response = await async_client.post("/api/groups/999999/sites:remove", json={"ids": [1]})
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_group_member_subresources(
+        self, async_client: AsyncClient, multiple_sites, multiple_groups
+    ):
+        """Test members are listed page by page and the detail can only count them."""
+        site_ids = sorted(site.id for site in multiple_sites)
+        child_ids = [group.id for group in multiple_groups[:2]]
+        group = await async_client.post(
+            "/api/groups",
+            json={
+                "name": "Portfolio",
+                "type": "group1",
+                "sites": site_ids,
+                "child_groups": child_ids,
+            },
+        )
+        group_id = group.json()["id"]
+
+        response = await async_client.get(
+            f"/api/groups/{group_id}/sites?sort=id&limit=2&count=exact"
+        )
+        assert [site["id"] for site in response.json()] == site_ids[:2]
+        assert response.headers["X-Total-Count"] == "3"
+        cursor = response.headers["X-Next-Cursor"]
+        response = await async_client.get(f"/api/groups/{group_id}/sites?sort=id&after={cursor}")
+        assert [site["id"] for site in response.json()] == site_ids[2:]
+        response = await async_client.get(f"/api/groups/{group_id}/sites?country=it&fields=id")
+        assert response.json() == [{"id": multiple_sites[2].id}]
+
+        response = await async_client.get(f"/api/groups/{group_id}/children?group_type=group2")
+        assert [child["id"] for child in response.json()] == [multiple_groups[1].id]
+
+        response = await async_client.get(f"/api/groups/{group_id}?members=counts")
+        assert response.json() == {
+            "id": group_id,
+            "name": "Portfolio",
+            "type": "group1",
+            "site_count": 3,
+            "child_group_count": 2,
+        }
+
+        for path in ("sites", "children"):
+            response = await async_client.get(f"/api/groups/999999/{path}")
+            assert response.status_code == 404
+        response = await async_client.get("/api/groups/999999?members=counts")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_groups(
+        self, async_client: AsyncClient, multiple_groups, sample_fr_site
+    ):
+        """Test updating every group matching the filters."""
+        response = await async_client.patch(
+            "/api/groups?group_type=group1", json={"name": "Renamed"}
+        )
+        assert response.json() == {"affected": 2, "dry_run": False}
+        response = await async_client.get("/api/groups?name=Renamed")
+        assert len(response.json()) == 2
+
+        group_a = multiple_groups[0].id
+        await async_client.post(
+            f"/api/groups/{group_a}/sites:add", json={"ids": [sample_fr_site.id]}
+        )
+        response = await async_client.patch("/api/groups?name=Renamed", json={"type": "group3"})
+        assert response.status_code == 400
+        response = await async_client.get(f"/api/groups/{group_a}")
+        assert response.json()["type"] == "group1"
+
+        response = await async_client.patch("/api/groups?name=Renamed", json={"type": None})
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_bulk_delete_groups(self, async_client: AsyncClient, sample_fr_site):
+        """Test deleting matching groups removes the subgroups they contain."""
+        group_ids = []
+        for name in ("Leaf", "Branch", "Root"):
+            response = await async_client.post(
+                "/api/groups", json={"name": name, "type": "group1", "child_groups": group_ids[-1:]}
+            )
+            group_ids.append(response.json()["id"])
+        root = group_ids[-1]
+        await async_client.post("/api/groups", json={"name": "Other", "type": "group2"})
+
+        response = await async_client.delete("/api/groups?name=Root&dry_run=true")
+        assert response.json() == {"affected": 3, "dry_run": True}
+        response = await async_client.delete("/api/groups?name=Branch")
+        assert response.json() == {"affected": 2, "dry_run": False}
+        response = await async_client.get("/api/groups")
+        assert [group["name"] for group in response.json()] == ["Root", "Other"]
+
+        await async_client.post(f"/api/groups/{root}/sites:add", json={"ids": [sample_fr_site.id]})
+        response = await async_client.delete("/api/groups?group_type=group1")
+        assert response.status_code == 400
+        response = await async_client.delete("/api/groups")
+        assert response.status_code == 400
+
     @pytest.mark.asyncio
     async def test_update_group_success(self, async_client: AsyncClient, sample_group):
         """Test successful group update."""